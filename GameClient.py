@@ -1,15 +1,17 @@
 import os
 import json
 import copy
+import threading
 from collections import OrderedDict
+from contextlib import nullcontext
 
-import paho.mqtt.client as paho
-from paho import mqtt
-from dotenv import load_dotenv
-
-from InputTypes import NewPlayer
+from InputTypes import NewPlayer, parseMove
 from game import Game
-from moveset import Moveset
+from mapPool import MapPool
+from serializer import JSON, getSerializer
+from deltaStream import DeltaEncoder
+from timerWheel import TimerWheel
+from transport import connectBroker
 
 # setting callbacks for different events to see if it works, print the message etc.
 def on_connect(client, userdata, flags, rc, properties=None):
@@ -57,12 +59,15 @@ def on_message(client, userdata, msg):
         :param userdata: userdata is set when initiating the client, here it is userdata=None
         :param msg: the message with topic and payload
     """
-    print("message: " + msg.topic + " " + str(msg.qos) + " " + str(msg.payload))
+    if getattr(client, 'verbose', True):
+        print("message: " + msg.topic + " " + str(msg.qos) + " " + str(msg.payload))
     topic_list = msg.topic.split("/")
 
     # Validate it is input we can deal with
     if topic_list[-1] in dispatch.keys(): 
-        dispatch[topic_list[-1]](client, topic_list, msg.payload)
+        # Turn deadlines resolve rounds from the timer wheel thread
+        with getattr(client, 'lock', nullcontext()):
+            dispatch[topic_list[-1]](client, topic_list, msg.payload)
 
 
 
@@ -85,7 +90,8 @@ def add_player(client, topic_list, msg_payload):
 
     add_team(client, player)
 
-    print(f'Added Player: {player.player_name} to Team: {player.team_name}')
+    if getattr(client, 'verbose', True):
+        print(f'Added Player: {player.player_name} to Team: {player.team_name}')
 
 
 def add_team(client, player):
@@ -96,43 +102,23 @@ def add_team(client, player):
     else:
         client.team_dict[player.lobby_name][player.team_name].append(player.player_name)
 
-move_to_Moveset = {
-    'UP' : Moveset.UP,
-    'DOWN' : Moveset.DOWN,
-    'LEFT' : Moveset.LEFT,
-    'RIGHT' : Moveset.RIGHT
-}
-
 # Dispatched Function: handles player movement commands
 def player_move(client, topic_list, msg_payload):
     lobby_name = topic_list[1]
     player_name = topic_list[2]
     if lobby_name in client.team_dict.keys():
+        new_move = parseMove(msg_payload)
+        game: Game = client.game_dict.get(lobby_name)
+        # Moves from names that are not in the game would make applyMoves fail for the whole round
+        if new_move is None or game is None or player_name not in game.all_players:
+            publish_error_to_lobby(client, lobby_name, f"Invalid move from {player_name}")
+            return
         try:
-            new_move = msg_payload.decode()
-
-            client.move_dict[lobby_name][player_name] = (player_name, move_to_Moveset[new_move])
-            game: Game = client.game_dict[lobby_name]
+            client.move_dict[lobby_name][player_name] = (player_name, new_move)
 
             # If all players made a move, resolve movement
             if len(game.all_players) == len(client.move_dict[lobby_name]):
-                for player, move in client.move_dict[lobby_name].values():
-                    game.movePlayer(player, move)
-
-                # Publish player states after all movement is resolved
-                for player, _ in client.move_dict[lobby_name].values():
-                    client.publish(f'games/{lobby_name}/{player}/game_state', json.dumps(game.getGameData(player)))
-
-                # Clear move list
-                client.move_dict[lobby_name].clear()
-                print(game.map)
-                client.publish(f'games/{lobby_name}/scores', json.dumps(game.getScores()))
-                if game.gameOver():
-                    # Publish game over, remove game
-                    publish_to_lobby(client, lobby_name, "Game Over: All coins have been collected")
-                    client.team_dict.pop(lobby_name)
-                    client.move_dict.pop(lobby_name)
-                    client.game_dict.pop(lobby_name)
+                resolve_round(client, lobby_name)
 
         except Exception as e:
             raise e
@@ -141,6 +127,60 @@ def player_move(client, topic_list, msg_payload):
         publish_error_to_lobby(client, lobby_name, "Lobby name not found.")
 
 
+# Applies the moves collected for a lobby, players without a move stay where they are
+def resolve_round(client, lobby_name):
+    game: Game = client.game_dict[lobby_name]
+    game.applyMoves(client.move_dict[lobby_name].values())
+
+    # Publish player states after all movement is resolved
+    publish_game_states(client, lobby_name, game, game.all_players.keys())
+
+    # Clear move list
+    client.move_dict[lobby_name].clear()
+    if getattr(client, 'verbose', True):
+        print(game.map)
+    client.publish(f'games/{lobby_name}/scores', encode(client, game.getScores()))
+    client.publish(f'games/{lobby_name}/coins_left', encode(client, game.getCoinsLeft()))
+    if game.gameOver():
+        # Publish game over, remove game
+        publish_to_lobby(client, lobby_name, "Game Over: All coins have been collected")
+        remove_lobby(client, lobby_name)
+    else:
+        schedule_deadline(client, lobby_name)
+
+
+# With client.turn_deadline set, resolves the round with whatever moves arrived once the deadline passes
+def schedule_deadline(client, lobby_name):
+    if getattr(client, 'turn_deadline', None) is None:
+        return
+    previous = client.deadline_dict.get(lobby_name)
+    if previous is not None:
+        previous[1].cancel()
+    token = object()
+    client.deadline_dict[lobby_name] = (token, client.timer_wheel.schedule(client.turn_deadline, turn_deadline_passed, client, lobby_name, token))
+
+
+# Runs on the timer wheel thread
+def turn_deadline_passed(client, lobby_name, token):
+    with client.lock:
+        # The round may have resolved on its own while this timer was firing
+        deadline = client.deadline_dict.get(lobby_name)
+        if deadline is not None and deadline[0] is token:
+            resolve_round(client, lobby_name)
+
+
+# Dispatched function: a player's delta decoder lost track, sends them a keyframe straight away
+def resync_player(client, topic_list, msg_payload):
+    lobby_name = topic_list[1]
+    player_name = topic_list[2]
+    game: Game = client.game_dict.get(lobby_name)
+    encoder = client.delta_dict.get(lobby_name)
+    if game is None or encoder is None or player_name not in game.all_players:
+        return
+    encoder.keyframe(player_name)
+    publish_game_states(client, lobby_name, game, [player_name])
+
+
 # Dispatched function: Instantiates Game object
 def start_game(client, topic_list, msg_payload):
     lobby_name = topic_list[1]
@@ -151,21 +191,59 @@ def start_game(client, topic_list, msg_payload):
                 dict_copy = copy.deepcopy(client.team_dict[lobby_name])
                 dict_copy.pop('started')
 
-                game = Game(dict_copy)
+                # Game keys players by name, so a player who joined twice only gets one slot on the map
+                numPlayers = len({name for players in dict_copy.values() for name in players})
+                game = Game(dict_copy, premadeMap=client.map_pool.get(10, 10, numPlayers))
                 client.game_dict[lobby_name] = game
                 client.move_dict[lobby_name] = OrderedDict()
                 client.team_dict[lobby_name]["started"] = True
 
-                for player in game.all_players.keys():
-                    client.publish(f'games/{lobby_name}/{player}/game_state', json.dumps(game.getGameData(player)))
+                publish_game_states(client, lobby_name, game, game.all_players.keys())
+                schedule_deadline(client, lobby_name)
 
-
-                print(game.map)
+                if getattr(client, 'verbose', True):
+                    print(game.map)
     elif isinstance(msg_payload, bytes) and msg_payload.decode() == "STOP":
         publish_to_lobby(client, lobby_name, "Game Over: Game has been stopped")
-        client.team_dict.pop(lobby_name, None)
-        client.move_dict.pop(lobby_name, None)
-        client.game_dict.pop(lobby_name, None)
+        remove_lobby(client, lobby_name)
+
+
+def remove_lobby(client, lobby_name):
+    client.team_dict.pop(lobby_name, None)
+    client.move_dict.pop(lobby_name, None)
+    client.game_dict.pop(lobby_name, None)
+    if hasattr(client, 'delta_dict'):
+        client.delta_dict.pop(lobby_name, None)
+    if hasattr(client, 'deadline_dict'):
+        deadline = client.deadline_dict.pop(lobby_name, None)
+        if deadline is not None:
+            deadline[1].cancel()
+
+
+# Serializes state payloads with client.serializer, stdlib json unless GAME_SERIALIZER picks another one
+def encode(client, data):
+    return getattr(client, 'serializer', JSON).dumps(data)
+
+
+# Game data for one player, delta encoded against the last message sent to them when client.delta_state is set
+def game_state(client, lobby_name, game, player):
+    state = game.getGameData(player)
+    if getattr(client, 'delta_state', False):
+        if lobby_name not in client.delta_dict:
+            client.delta_dict[lobby_name] = DeltaEncoder()
+        state = client.delta_dict[lobby_name].encode(player, state)
+    return state
+
+
+# Publishes the state of every player, either one message per player on games/{lobby}/{player}/game_state
+# or, with client.batch_state set, one message per round on games/{lobby}/game_state keyed by player name
+def publish_game_states(client, lobby_name, game, players):
+    if getattr(client, 'batch_state', False):
+        states = {player: game_state(client, lobby_name, game, player) for player in players}
+        client.publish(f'games/{lobby_name}/game_state', encode(client, states))
+    else:
+        for player in players:
+            client.publish(f'games/{lobby_name}/{player}/game_state', encode(client, game_state(client, lobby_name, game, player)))
 
 
 def publish_error_to_lobby(client, lobby_name, error):
@@ -180,38 +258,47 @@ dispatch = {
     'new_game' : add_player,
     'move' : player_move,
     'start' : start_game,
+    'resync' : resync_player,
 }
 
 
-if __name__ == '__main__':
-    load_dotenv(dotenv_path='./credentials.env')
-    
-    broker_address = os.environ.get('BROKER_ADDRESS')
-    broker_port = int(os.environ.get('BROKER_PORT'))
-    username = os.environ.get('USER_NAME')
-    password = os.environ.get('PASSWORD')
+# Stashes the server state on a paho or loopback client (see transport.py), configured from the environment
+def init_client(client, verbose=True, subscribe=True):
+    client.team_dict = {} # Keeps tracks of players before a game starts {'lobby_name' : {'team_name' : [player_name, ...]}}
+    client.game_dict = {} # Keeps track of the games {{'lobby_name' : Game Object}
+    client.move_dict = {} # Keeps track of the games {{'lobby_name' : Game Object}
+    client.verbose = verbose # Print every message and map, turn off for load tests
+    client.batch_state = os.environ.get('BATCH_GAME_STATE') == '1' # One game_state message per lobby per round
+    client.serializer = getSerializer(os.environ.get('GAME_SERIALIZER')) # json, orjson or msgpack
+    client.delta_state = os.environ.get('DELTA_GAME_STATE') == '1' # Keyframe then window deltas, see deltaStream.py
+    client.delta_dict = {} # Keeps track of the delta encoders {'lobby_name' : DeltaEncoder}
+    client.turn_deadline = float(os.environ['TURN_DEADLINE']) if os.environ.get('TURN_DEADLINE') else None # Seconds per turn, unset waits for every player
+    client.deadline_dict = {} # Keeps track of the pending turn deadlines {'lobby_name' : (token, Timer)}
+    client.timer_wheel = TimerWheel() # One timer thread shared by every lobby
+    client.lock = threading.Lock() # Guards the dicts above between the message thread and the timer wheel
+    client.map_pool = MapPool([(10, 10, numPlayers) for numPlayers in range(2, 9)]) # Ready 10x10 maps for 2-8 players
+    client.on_message = on_message
 
-    client = paho.Client(callback_api_version=paho.CallbackAPIVersion.VERSION1, client_id="GameClient", userdata=None, protocol=paho.MQTTv5)
-    
-    # enable TLS for secure connection
-    client.tls_set(tls_version=mqtt.client.ssl.PROTOCOL_TLS)
-    # set username and password
-    client.username_pw_set(username, password)
-    # connect to HiveMQ Cloud on port 8883 (default for MQTT)
-    client.connect(broker_address, broker_port)
+    if subscribe:
+        client.subscribe("new_game")
+        client.subscribe('games/+/start')
+        client.subscribe('games/+/+/move')
+        client.subscribe('games/+/+/resync')
+
+
+# Stops the threads started by init_client
+def close_client(client):
+    client.map_pool.stop()
+    client.timer_wheel.stop()
+
+
+if __name__ == '__main__':
+    # connect to HiveMQ Cloud on port 8883 (default for MQTT) with the settings in credentials.env
+    client = connectBroker("GameClient")
 
     # setting callbacks, use separate functions like above for better visibility
     client.on_subscribe = on_subscribe # Can comment out to not print when subscribing to new topics
-    client.on_message = on_message
     client.on_publish = on_publish # Can comment out to not print when publishing to topics
-    
-    # custom dictionary to track players
-    client.team_dict = {} # Keeps tracks of players before a game starts {'lobby_name' : {'team_name' : [player_name, ...]}}
-    client.game_dict = {} # Keeps track of the games {{'lobby_name' : Game Object}
-    client.move_dict = {} # Keeps track of the games {{'lobby_name' : Game Object}
-
-    client.subscribe("new_game")
-    client.subscribe('games/+/start')
-    client.subscribe('games/+/+/move')
 
+    init_client(client)
     client.loop_forever()
@@ -1,5 +1,9 @@
+from typing import Optional, Union
+
 from pydantic import BaseModel, Field
 
+from moveset import Moveset
+
 class NewPlayer(BaseModel):
     lobby_name: str = Field(..., min_length=1, max_length=20)
     team_name: str = Field(..., min_length=1, max_length=20)
@@ -9,4 +13,16 @@ class Move(BaseModel):
     move: str = Field(..., pattern=r'^(UP|DOWN|LEFT|RIGHT)$')
 
 class Start(BaseModel):
-    start: str = Field(..., pattern=r'^(START)$')
\ No newline at end of file
+    start: str = Field(..., pattern=r'^(START)$')
+
+
+# Fast path for per-round move messages: one dict lookup on the raw payload, no decoding and no allocation.
+# Same moves as the Move model, which stays for validating moves outside the hot path.
+MOVES: dict[Union[bytes, str], Moveset] = {key: move for move in Moveset for key in (move.name, move.name.encode())}
+
+
+def parseMove(payload: Union[bytes, str]) -> Optional[Moveset]:
+    """
+    :return: The Moveset for a raw move payload such as b'UP', or None if it is not a valid move
+    """
+    return MOVES.get(payload)
@@ -2,6 +2,9 @@ import os
 import json
 from dotenv import load_dotenv
 
+from serializer import decode
+from deltaStream import decodeState
+
 import paho.mqtt.client as paho
 from paho import mqtt
 import time
@@ -23,6 +26,9 @@ p2_frontier = []
 p3_frontier = []
 p4_frontier = []
 
+# Rebuilds full game states when the server sends deltas
+delta_decoders = {}
+
 # setting callbacks for different events to see if it works, print the message etc.
 def on_connect(client, userdata, flags, rc, properties=None):
     """
@@ -72,24 +78,36 @@ def on_message(client, userdata, msg):
 
     print("message: " + msg.topic + " " + str(msg.qos) + " " + str(msg.payload))
 
-    player_number = 0
-
-    if "Player" in msg.topic:
-        player_number = int(msg.topic[22:23])
-
-    if player_number == 1:
-        curr_position_1 = json.loads(msg.payload.decode('utf-8'))["currentPosition"]
-        print("IT CHANGED ",curr_position_1)
-        p1_frontier.append(curr_position_1)
-    if player_number == 2:
-        curr_position_2 = json.loads(msg.payload.decode('utf-8'))["currentPosition"]
-        p2_frontier.append(curr_position_2)
-    if player_number == 3:
-        curr_position_3 = json.loads(msg.payload.decode('utf-8'))["currentPosition"]
-        p3_frontier.append(curr_position_3)
-    if player_number == 4:
-        curr_position_4 = json.loads(msg.payload.decode('utf-8'))["currentPosition"]
-        p4_frontier.append(curr_position_4)
+    topic_list = msg.topic.split("/")
+    if topic_list[-1] != "game_state":
+        return
+    # Batched servers publish every player's state in one message on games/{lobby}/game_state
+    if len(topic_list) == 3:
+        game_states = decode(msg.payload)
+    else:
+        game_states = {topic_list[2]: decode(msg.payload)}
+
+    for player_name, game_state in game_states.items():
+        game_state = decodeState(delta_decoders, player_name, game_state)
+        if game_state is None:
+            # Missed a delta, ask for a keyframe
+            client.publish(f"games/{topic_list[1]}/{player_name}/resync", "")
+            continue
+
+        player_number = int(player_name[6:7])
+        if player_number == 1:
+            curr_position_1 = game_state["currentPosition"]
+            print("IT CHANGED ",curr_position_1)
+            p1_frontier.append(curr_position_1)
+        if player_number == 2:
+            curr_position_2 = game_state["currentPosition"]
+            p2_frontier.append(curr_position_2)
+        if player_number == 3:
+            curr_position_3 = game_state["currentPosition"]
+            p3_frontier.append(curr_position_3)
+        if player_number == 4:
+            curr_position_4 = game_state["currentPosition"]
+            p4_frontier.append(curr_position_4)
 
     print("first frontier", p1_frontier)
 
@@ -123,6 +141,7 @@ if __name__ == '__main__':
 
     client.subscribe(f"games/{lobby_name}/lobby")
     client.subscribe(f'games/{lobby_name}/+/game_state')
+    client.subscribe(f'games/{lobby_name}/game_state')
     client.subscribe(f'games/{lobby_name}/scores')
 
     client.publish("new_game", json.dumps({'lobby_name':lobby_name,
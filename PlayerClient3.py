@@ -2,6 +2,9 @@ import os
 import json
 from dotenv import load_dotenv
 
+from serializer import decode
+from deltaStream import decodeState
+
 import paho.mqtt.client as paho
 from paho import mqtt
 import time
@@ -11,6 +14,9 @@ numCoin2 = None
 numCoin3 = None
 numCoin4 = None
 
+# Rebuilds full game states when the server sends deltas
+delta_decoders = {}
+
 # setting callbacks for different events to see if it works, print the message etc.
 def on_connect(client, userdata, flags, rc, properties=None):
     """
@@ -60,13 +66,28 @@ def on_message(client, userdata, msg):
 
     print("message: " + msg.topic + " " + str(msg.qos) + " " + str(msg.payload))
 
-    numCoin1 = len(json.loads(msg.payload.decode('utf-8'))["coin1"])
-    numCoin2 = len(json.loads(msg.payload.decode('utf-8'))["coin2"])
-    numCoin3 = len(json.loads(msg.payload.decode('utf-8'))["coin3"])
-    
-    print("COIN1", numCoin1)
-    print("COIN2", numCoin2)
-    print("COIN3", numCoin3)
+    topic_list = msg.topic.split("/")
+    if topic_list[-1] != "game_state":
+        return
+    # Batched servers publish every player's state in one message on games/{lobby}/game_state
+    if len(topic_list) == 3:
+        game_states = decode(msg.payload)
+    else:
+        game_states = {topic_list[2]: decode(msg.payload)}
+
+    for player_name, game_state in game_states.items():
+        game_state = decodeState(delta_decoders, player_name, game_state)
+        if game_state is None:
+            # Missed a delta, ask for a keyframe
+            client.publish(f"games/{topic_list[1]}/{player_name}/resync", "")
+            continue
+        numCoin1 = len(game_state["coin1"])
+        numCoin2 = len(game_state["coin2"])
+        numCoin3 = len(game_state["coin3"])
+
+        print("COIN1", numCoin1)
+        print("COIN2", numCoin2)
+        print("COIN3", numCoin3)
 
 
 if __name__ == '__main__':
@@ -99,6 +120,7 @@ if __name__ == '__main__':
 
     client.subscribe(f"games/{lobby_name}/lobby")
     client.subscribe(f'games/{lobby_name}/+/game_state')
+    client.subscribe(f'games/{lobby_name}/game_state')
     client.subscribe(f'games/{lobby_name}/scores')
 
     client.publish("new_game", json.dumps({'lobby_name':lobby_name,
@@ -2,22 +2,30 @@ import os
 import json
 from dotenv import load_dotenv
 
+from serializer import decode
+from deltaStream import decodeState
+from worldModel import WorldModel
+
 import paho.mqtt.client as paho
 from paho import mqtt
 import time
 
-# stores current positions in the form of a stack--acts as an array to store all visited/explored positions
-currentPosition_p1 = []
-currentPosition_p2 = []
-currentPosition_p3 = []
-currentPosition_p4 = []
+# everything each team has seen: walls, coins and where every player was last
+# one model per team, so a team only plans on what its own players have seen
+teams = {'Player1': 'ATeam', 'Player2': 'ATeam', 'Player3': 'BTeam', 'Player4': 'BTeam'}
+worlds = {'ATeam': WorldModel(), 'BTeam': WorldModel()}
+
+# positions each player has already explored
+visited = {'Player1': set(), 'Player2': set(), 'Player3': set(), 'Player4': set()}
+visited_p1 = visited['Player1']
+visited_p2 = visited['Player2']
+visited_p3 = visited['Player3']
+visited_p4 = visited['Player4']
+walls_a = worlds['ATeam'].walls
+walls_b = worlds['BTeam'].walls
 
-coin1 = None
-coin2 = None
-coin3 = None
-walls = []
-enemyPositions = None
-teammatePositions = None
+# Rebuilds full game states when the server sends deltas
+delta_decoders = {}
 
 
 # setting callbacks for different events to see if it works, print the message etc.
@@ -69,28 +77,26 @@ def on_message(client, userdata, msg):
 
     print("message: " + msg.topic + " " + str(msg.qos) + " " + str(msg.payload))
 
-    if ("Player1" in msg.topic):
-        currentPosition_p1.append(json.loads(msg.payload).get("currentPosition"))
-
-    if ("Player2" in msg.topic):
-        currentPosition_p2.append(json.loads(msg.payload).get("currentPosition"))
-
-    if ("Player3" in msg.topic):
-        currentPosition_p3.append(json.loads(msg.payload).get("currentPosition"))
-    
-    if ("Player4" in msg.topic):
-        currentPosition_p4.append(json.loads(msg.payload).get("currentPosition"))
-
-    walls_vals = json.loads(msg.payload).get("walls")
-
-    if walls_vals:
-        for wall in walls_vals:
-            if(wall not in walls):
-                walls.append(wall)
-    
-    enemyPositions = json.loads(msg.payload).get("enemyPositions")
-
-    teammatePositions = json.loads(msg.payload).get("teammatePositions")
+    topic_list = msg.topic.split("/")
+    if topic_list[-1] != "game_state":
+        return
+    # Batched servers publish every player's state in one message on games/{lobby}/game_state
+    if len(topic_list) == 3:
+        game_states = decode(msg.payload)
+    else:
+        game_states = {topic_list[2]: decode(msg.payload)}
+
+    for player_name, game_state in game_states.items():
+        if player_name not in teams:
+            continue
+        # fold the state into the world model, O(size of the state) instead of rescanning lists
+        game_state = decodeState(delta_decoders, player_name, game_state)
+        if game_state is None:
+            # Missed a delta, ask for a keyframe
+            client.publish(f"games/{topic_list[1]}/{player_name}/resync", "")
+            continue
+        worlds[teams[player_name]].update(game_state, player_name)
+        visited[player_name].add(tuple(game_state["currentPosition"]))
 
 
 if __name__ == '__main__':
@@ -123,6 +129,7 @@ if __name__ == '__main__':
 
     client.subscribe(f"games/{lobby_name}/lobby")
     client.subscribe(f'games/{lobby_name}/+/game_state')
+    client.subscribe(f'games/{lobby_name}/game_state')
     client.subscribe(f'games/{lobby_name}/scores')
 
     client.publish("new_game", json.dumps({'lobby_name':lobby_name,
@@ -152,11 +159,11 @@ if __name__ == '__main__':
     explored = []
 
     while(True):
-        # get the current position from the explored positions arrays for each player (acts as a stack)
-        curr_pos_p1 = currentPosition_p1[-1]
-        curr_pos_p2 = currentPosition_p2[-1]
-        curr_pos_p3 = currentPosition_p3[-1]
-        curr_pos_p4 = currentPosition_p4[-1]
+        # get the current position of each player from their team's world model
+        curr_pos_p1 = worlds[teams[player_1]].teammates[player_1][0]
+        curr_pos_p2 = worlds[teams[player_2]].teammates[player_2][0]
+        curr_pos_p3 = worlds[teams[player_3]].teammates[player_3][0]
+        curr_pos_p4 = worlds[teams[player_4]].teammates[player_4][0]
 
         ## calculate the future (x,y) coordinates of each player given each type of move
 
@@ -164,73 +171,73 @@ if __name__ == '__main__':
 
         up_pos_p1_x = int(curr_pos_p1[0])-1
         up_pos_p1_y = int(curr_pos_p1[1])
-        up_pos_p1 = [up_pos_p1_x, up_pos_p1_y]
+        up_pos_p1 = (up_pos_p1_x, up_pos_p1_y)
 
         down_pos_p1_x = int(curr_pos_p1[0])+1
         down_pos_p1_y = int(curr_pos_p1[1])
-        down_pos_p1 = [down_pos_p1_x, down_pos_p1_y]
+        down_pos_p1 = (down_pos_p1_x, down_pos_p1_y)
 
         right_pos_p1_x = int(curr_pos_p1[0])
         right_pos_p1_y = int(curr_pos_p1[1])+1
-        right_pos_p1 = [right_pos_p1_x, right_pos_p1_y]
+        right_pos_p1 = (right_pos_p1_x, right_pos_p1_y)
 
         left_pos_p1_x = int(curr_pos_p1[0])
         left_pos_p1_y = int(curr_pos_p1[1])-1
-        left_pos_p1 = [left_pos_p1_x, left_pos_p1_y]
+        left_pos_p1 = (left_pos_p1_x, left_pos_p1_y)
 
         #player 2 possible positions
 
         up_pos_p2_x = int(curr_pos_p2[0])-1
         up_pos_p2_y = int(curr_pos_p2[1])
-        up_pos_p2 = [up_pos_p2_x, up_pos_p2_y]
+        up_pos_p2 = (up_pos_p2_x, up_pos_p2_y)
 
         down_pos_p2_x = int(curr_pos_p2[0])+1
         down_pos_p2_y = int(curr_pos_p2[1])
-        down_pos_p2 = [down_pos_p2_x, down_pos_p2_y]
+        down_pos_p2 = (down_pos_p2_x, down_pos_p2_y)
 
         right_pos_p2_x = int(curr_pos_p2[0])
         right_pos_p2_y = int(curr_pos_p2[1])+1
-        right_pos_p2 = [right_pos_p2_x, right_pos_p2_y]
+        right_pos_p2 = (right_pos_p2_x, right_pos_p2_y)
 
         left_pos_p2_x = int(curr_pos_p2[0])
         left_pos_p2_y = int(curr_pos_p2[1])-1
-        left_pos_p2 = [left_pos_p2_x, left_pos_p2_y]
+        left_pos_p2 = (left_pos_p2_x, left_pos_p2_y)
 
         #player 3 possible positions
 
         up_pos_p3_x = int(curr_pos_p3[0])-1
         up_pos_p3_y = int(curr_pos_p3[1])
-        up_pos_p3 = [up_pos_p3_x, up_pos_p3_y]
+        up_pos_p3 = (up_pos_p3_x, up_pos_p3_y)
 
         down_pos_p3_x = int(curr_pos_p3[0])+1
         down_pos_p3_y = int(curr_pos_p3[1])
-        down_pos_p3 = [down_pos_p3_x, down_pos_p3_y]
+        down_pos_p3 = (down_pos_p3_x, down_pos_p3_y)
 
         right_pos_p3_x = int(curr_pos_p3[0])
         right_pos_p3_y = int(curr_pos_p3[1])+1
-        right_pos_p3 = [right_pos_p3_x, right_pos_p3_y]
+        right_pos_p3 = (right_pos_p3_x, right_pos_p3_y)
 
         left_pos_p3_x = int(curr_pos_p3[0])
         left_pos_p3_y = int(curr_pos_p3[1])-1
-        left_pos_p3 = [left_pos_p3_x, left_pos_p3_y]
+        left_pos_p3 = (left_pos_p3_x, left_pos_p3_y)
 
         #player 4 possible positions
 
         up_pos_p4_x = int(curr_pos_p4[0])-1
         up_pos_p4_y = int(curr_pos_p4[1])
-        up_pos_p4 = [up_pos_p4_x, up_pos_p4_y]
+        up_pos_p4 = (up_pos_p4_x, up_pos_p4_y)
 
         down_pos_p4_x = int(curr_pos_p4[0])+1
         down_pos_p4_y = int(curr_pos_p4[1])
-        down_pos_p4 = [down_pos_p4_x, down_pos_p4_y]
+        down_pos_p4 = (down_pos_p4_x, down_pos_p4_y)
 
         right_pos_p4_x = int(curr_pos_p4[0])
         right_pos_p4_y = int(curr_pos_p4[1])+1
-        right_pos_p4 = [right_pos_p4_x, right_pos_p4_y]
+        right_pos_p4 = (right_pos_p4_x, right_pos_p4_y)
 
         left_pos_p4_x = int(curr_pos_p4[0])
         left_pos_p4_y = int(curr_pos_p4[1])-1
-        left_pos_p4 = [left_pos_p4_x, left_pos_p4_y]
+        left_pos_p4 = (left_pos_p4_x, left_pos_p4_y)
 
         ## checks if the player is in the range of the grid (ie. between 0 and 9 on x and y axis)
 
@@ -266,28 +273,28 @@ if __name__ == '__main__':
         # Store this information as a boolean
 
         # check if explored player 1
-        up_not_explored_p1 = up_pos_p1 not in currentPosition_p1
-        down_not_explored_p1 = down_pos_p1 not in currentPosition_p1
-        right_not_explored_p1 = right_pos_p1 not in currentPosition_p1
-        left_not_explored_p1 = left_pos_p1 not in currentPosition_p1
+        up_not_explored_p1 = up_pos_p1 not in visited_p1
+        down_not_explored_p1 = down_pos_p1 not in visited_p1
+        right_not_explored_p1 = right_pos_p1 not in visited_p1
+        left_not_explored_p1 = left_pos_p1 not in visited_p1
 
         # check if explored player 2
-        up_not_explored_p2 = up_pos_p2 not in currentPosition_p2
-        down_not_explored_p2 = down_pos_p2 not in currentPosition_p2
-        right_not_explored_p2 = right_pos_p2 not in currentPosition_p2
-        left_not_explored_p2 = left_pos_p2 not in currentPosition_p2
+        up_not_explored_p2 = up_pos_p2 not in visited_p2
+        down_not_explored_p2 = down_pos_p2 not in visited_p2
+        right_not_explored_p2 = right_pos_p2 not in visited_p2
+        left_not_explored_p2 = left_pos_p2 not in visited_p2
 
         # check if explored player 3
-        up_not_explored_p3 = up_pos_p3 not in currentPosition_p3
-        down_not_explored_p3 = down_pos_p3 not in currentPosition_p3
-        right_not_explored_p3 = right_pos_p3 not in currentPosition_p3
-        left_not_explored_p3 = left_pos_p3 not in currentPosition_p3
+        up_not_explored_p3 = up_pos_p3 not in visited_p3
+        down_not_explored_p3 = down_pos_p3 not in visited_p3
+        right_not_explored_p3 = right_pos_p3 not in visited_p3
+        left_not_explored_p3 = left_pos_p3 not in visited_p3
 
         # check if explored player 4
-        up_not_explored_p4 = up_pos_p4 not in currentPosition_p4
-        down_not_explored_p4 = down_pos_p4 not in currentPosition_p4
-        right_not_explored_p4 = right_pos_p4 not in currentPosition_p4
-        left_not_explored_p4 = left_pos_p4 not in currentPosition_p4
+        up_not_explored_p4 = up_pos_p4 not in visited_p4
+        down_not_explored_p4 = down_pos_p4 not in visited_p4
+        right_not_explored_p4 = right_pos_p4 not in visited_p4
+        left_not_explored_p4 = left_pos_p4 not in visited_p4
 
         ## checking for existing players
         # checks if the future positions for each type of move  are empty or contain a different player. 
@@ -405,75 +412,75 @@ if __name__ == '__main__':
 
         # select player 1 move
 
-        if (up_pos_p1 not in walls and up_in_range_p1 and p1_up_check and up_pos_p1 not in currentPosition_p1):
+        if (up_pos_p1 not in walls_a and up_in_range_p1 and p1_up_check and up_pos_p1 not in visited_p1):
             p1_move = "UP"
-        elif (down_pos_p1 not in walls and down_in_range_p1 and p1_down_check and down_pos_p1 not in currentPosition_p1):
+        elif (down_pos_p1 not in walls_a and down_in_range_p1 and p1_down_check and down_pos_p1 not in visited_p1):
             p1_move = "DOWN"
-        elif (right_pos_p1 not in walls and right_in_range_p1 and p1_right_check and right_pos_p1 not in currentPosition_p1):
+        elif (right_pos_p1 not in walls_a and right_in_range_p1 and p1_right_check and right_pos_p1 not in visited_p1):
             p1_move = "RIGHT"
-        elif(left_pos_p1 not in walls and left_in_range_p1 and p1_left_check and left_pos_p1 not in currentPosition_p1):
+        elif(left_pos_p1 not in walls_a and left_in_range_p1 and p1_left_check and left_pos_p1 not in visited_p1):
             p1_move = "LEFT"
-        elif (up_pos_p1 not in walls and up_in_range_p1 and p1_up_check):
+        elif (up_pos_p1 not in walls_a and up_in_range_p1 and p1_up_check):
             p1_move = "UP"
-        elif (down_pos_p1 not in walls and down_in_range_p1 and p1_down_check):
+        elif (down_pos_p1 not in walls_a and down_in_range_p1 and p1_down_check):
             p1_move = "DOWN"
-        elif (right_pos_p1 not in walls and right_in_range_p1 and p1_right_check):
+        elif (right_pos_p1 not in walls_a and right_in_range_p1 and p1_right_check):
             p1_move = "RIGHT"
         else:
             p1_move = "LEFT"
     
         # select player 2 move
         
-        if (down_pos_p2 not in walls and down_in_range_p2 and p2_down_check and down_pos_p2 not in currentPosition_p2):
+        if (down_pos_p2 not in walls_a and down_in_range_p2 and p2_down_check and down_pos_p2 not in visited_p2):
             p2_move = "DOWN"
-        elif (right_pos_p2 not in walls and right_in_range_p2 and p2_right_check and right_pos_p2 not in currentPosition_p2):
+        elif (right_pos_p2 not in walls_a and right_in_range_p2 and p2_right_check and right_pos_p2 not in visited_p2):
             p2_move = "RIGHT"
-        elif (up_pos_p2 not in walls and up_in_range_p2 and p2_up_check and  up_pos_p2 not in currentPosition_p2):
+        elif (up_pos_p2 not in walls_a and up_in_range_p2 and p2_up_check and  up_pos_p2 not in visited_p2):
             p2_move = "UP"
-        elif(left_pos_p2 not in walls and left_in_range_p2 and p2_left_check and left_pos_p2 not in currentPosition_p2): 
+        elif(left_pos_p2 not in walls_a and left_in_range_p2 and p2_left_check and left_pos_p2 not in visited_p2):
             p2_move = "LEFT"
-        elif (down_pos_p2 not in walls and down_in_range_p2 and p2_down_check):
+        elif (down_pos_p2 not in walls_a and down_in_range_p2 and p2_down_check):
             p2_move = "DOWN"
-        elif (right_pos_p2 not in walls and right_in_range_p2 and p2_right_check):
+        elif (right_pos_p2 not in walls_a and right_in_range_p2 and p2_right_check):
             p2_move = "RIGHT"
-        elif (up_pos_p2 not in walls and up_in_range_p2 and p2_up_check):
+        elif (up_pos_p2 not in walls_a and up_in_range_p2 and p2_up_check):
             p2_move = "UP"
         else: #add elif for this too, and if none of them work, then randomize. 
             p2_move = "LEFT"
         
         # select player 3 move
         
-        if (right_pos_p3 not in walls and right_in_range_p3 and p3_right_check and right_pos_p3 not in currentPosition_p3):
+        if (right_pos_p3 not in walls_b and right_in_range_p3 and p3_right_check and right_pos_p3 not in visited_p3):
             p3_move = "RIGHT"
-        elif (up_pos_p3 not in walls and up_in_range_p3 and p3_up_check and up_pos_p3 not in currentPosition_p3):
+        elif (up_pos_p3 not in walls_b and up_in_range_p3 and p3_up_check and up_pos_p3 not in visited_p3):
             p3_move = "UP"
-        elif (down_pos_p3 not in walls and down_in_range_p3 and p3_down_check and down_pos_p3 not in currentPosition_p3):
+        elif (down_pos_p3 not in walls_b and down_in_range_p3 and p3_down_check and down_pos_p3 not in visited_p3):
             p3_move = "DOWN"
-        elif (left_pos_p3 not in walls and left_in_range_p3 and p3_left_check and left_pos_p3 not in currentPosition_p3):
+        elif (left_pos_p3 not in walls_b and left_in_range_p3 and p3_left_check and left_pos_p3 not in visited_p3):
             p3_move = "LEFT"
-        elif (right_pos_p3 not in walls and right_in_range_p3):
+        elif (right_pos_p3 not in walls_b and right_in_range_p3):
             p3_move = "RIGHT"
-        elif (up_pos_p3 not in walls and up_in_range_p3):
+        elif (up_pos_p3 not in walls_b and up_in_range_p3):
             p3_move = "UP"
-        elif (down_pos_p3 not in walls and down_in_range_p3 ):
+        elif (down_pos_p3 not in walls_b and down_in_range_p3 ):
             p3_move = "DOWN"
         else:
             p3_move = "LEFT"
         
         # select player 4 move
-        if (left_pos_p4 not in walls and left_in_range_p4 and p4_left_check and left_pos_p4 not in currentPosition_p4):
+        if (left_pos_p4 not in walls_b and left_in_range_p4 and p4_left_check and left_pos_p4 not in visited_p4):
             p4_move = "LEFT"
-        elif (down_pos_p4 not in walls and down_in_range_p4 and p4_down_check and down_pos_p4 not in currentPosition_p4):
+        elif (down_pos_p4 not in walls_b and down_in_range_p4 and p4_down_check and down_pos_p4 not in visited_p4):
             p4_move = "DOWN"
-        elif (right_pos_p4 not in walls and right_in_range_p4 and p4_right_check and right_pos_p4 not in currentPosition_p4):
+        elif (right_pos_p4 not in walls_b and right_in_range_p4 and p4_right_check and right_pos_p4 not in visited_p4):
             p4_move = "RIGHT"
-        elif (up_pos_p4 not in walls and up_in_range_p4 and p4_up_check and up_pos_p4 not in currentPosition_p4):
+        elif (up_pos_p4 not in walls_b and up_in_range_p4 and p4_up_check and up_pos_p4 not in visited_p4):
             p4_move = "UP"
-        elif (up_pos_p4 not in walls and up_in_range_p4):
+        elif (up_pos_p4 not in walls_b and up_in_range_p4):
             p4_move = "UP"
-        elif (down_pos_p4 not in walls and down_in_range_p4):
+        elif (down_pos_p4 not in walls_b and down_in_range_p4):
             p4_move = "DOWN"
-        elif (right_pos_p4 not in walls and right_in_range_p4):
+        elif (right_pos_p4 not in walls_b and right_in_range_p4):
             p4_move = "RIGHT"
         else:
             p4_move = "LEFT"
@@ -0,0 +1,353 @@
+"""
+Asyncio game server. Every lobby is its own task fed by its own queue, so a slow lobby (or one printing its
+map) does not hold up message handling for the others.
+
+Runs against an MQTT broker configured in credentials.env, or in-process with synthetic random bots:
+
+    python asyncServer.py
+    python asyncServer.py --loopback --lobbies 200 --players 4 --seconds 5
+    python asyncServer.py --loopback --lobbies 200 --tick-rate 20
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from InputTypes import NewPlayer, parseMove
+from game import Game
+from mapPool import MapPool
+from moveset import Moveset
+from serializer import JSON, Serializer, decode, getSerializer
+from deltaStream import DeltaEncoder
+from realtime import RealtimeGame, TickStats
+from transport import connectBroker
+
+class Lobby:
+    """
+    State and message handling for one lobby, run as its own task by AsyncGameServer
+    """
+
+    def __init__(self, server: 'AsyncGameServer', name: str):
+        self.server = server
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.teams: dict[str, list[str]] = {}
+        self.game: Optional[Game] = None
+        self.moves: OrderedDict = OrderedDict()
+        self.deltaEncoder: Optional[DeltaEncoder] = DeltaEncoder() if server.deltaState else None
+        self.round = 0
+        self.deadline: Optional[asyncio.TimerHandle] = None
+        self.realtime: Optional[RealtimeGame] = None
+        self.ticker: Optional[asyncio.Task] = None
+
+    async def run(self):
+        handlers = {'new_game': self.addPlayer, 'start': self.start, 'move': self.move, 'deadline': self.deadlinePassed,
+                    'tick': self.tick, 'resync': self.resync}
+        while True:
+            route, topic_list, payload = await self.queue.get()
+            if handlers[route](topic_list, payload):
+                return
+
+    def addPlayer(self, topic_list: list[str], player: NewPlayer) -> bool:
+        if self.game is not None:
+            self.publishError("Game has already started, please make a new lobby")
+            return False
+        self.teams.setdefault(player.team_name, []).append(player.player_name)
+        return False
+
+    def start(self, topic_list: list[str], payload: bytes) -> bool:
+        if payload == b'START':
+            if self.game is not None or not self.teams:
+                return False
+            # Game keys players by name, so a player who joined twice only gets one slot on the map
+            numPlayers = len({name for players in self.teams.values() for name in players})
+            premadeMap = None if self.server.mapPool is None else self.server.mapPool.get(10, 10, numPlayers)
+            self.game = Game(self.teams, premadeMap=premadeMap)
+            self.publishStates(self.game.all_players)
+            self.server.showMap(self.game)
+            if self.server.tickRate is not None:
+                self.realtime = RealtimeGame(self.game, self.server.tickRate, self.broadcast, self.server.tickStats)
+                self.ticker = asyncio.create_task(self.runTicker(), name=f'ticker-{self.name}')
+            else:
+                self.scheduleDeadline()
+        elif payload == b'STOP':
+            self.publish("Game Over: Game has been stopped")
+            return self.close()
+        return False
+
+    def move(self, topic_list: list[str], payload: bytes) -> bool:
+        player_name = topic_list[2]
+        game = self.game
+        if game is None:
+            self.publishError("Lobby name not found.")
+            return False
+        move = parseMove(payload)
+        if move is None or player_name not in game.all_players:
+            self.publishError(f"Invalid move from {player_name}")
+            return False
+        if self.realtime is not None:
+            self.realtime.submit(player_name, move)
+            return False
+        self.moves[player_name] = (player_name, move)
+
+        # If all players made a move, resolve movement
+        if len(game.all_players) != len(self.moves):
+            return False
+        return self.resolve()
+
+    def resync(self, topic_list: list[str], payload: bytes) -> bool:
+        # The player's delta decoder lost track, send them a keyframe straight away
+        player_name = topic_list[2]
+        if self.game is None or self.deltaEncoder is None or player_name not in self.game.all_players:
+            return False
+        self.deltaEncoder.keyframe(player_name)
+        self.publishStates((player_name,))
+        return False
+
+    def deadlinePassed(self, topic_list, round: int) -> bool:
+        # Ignore deadlines of rounds that already resolved on their own
+        if self.game is None or round != self.round:
+            return False
+        return self.resolve()
+
+    def resolve(self) -> bool:
+        """
+        Applies the moves that arrived, players without a move stay where they are
+        """
+        game = self.game
+        self.broadcast(game.applyMoves(self.moves.values()))
+        self.round += 1
+        self.moves.clear()
+        if game.gameOver():
+            self.publish("Game Over: All coins have been collected")
+            return self.close()
+        self.scheduleDeadline()
+        return False
+
+    def broadcast(self, diff: dict):
+        """
+        Publishes every player's state, the scores and the coins left after a round or tick
+        """
+        self.publishStates(self.game.all_players)
+        self.server.showMap(self.game)
+        self.server.publish(f'games/{self.name}/scores', self.server.serializer.dumps(self.game.getScores()))
+        self.server.publish(f'games/{self.name}/coins_left', self.server.serializer.dumps(self.game.getCoinsLeft()))
+
+    async def runTicker(self):
+        # Ticks go through the lobby queue like every other event, so lobby state is only touched by run()
+        while True:
+            await asyncio.sleep(self.realtime.delay())
+            self.queue.put_nowait(('tick', None, None))
+
+    def tick(self, topic_list, payload) -> bool:
+        if self.realtime is None:
+            return False
+        self.realtime.tick()
+        if self.game.gameOver():
+            self.publish("Game Over: All coins have been collected")
+            return self.close()
+        return False
+
+    def scheduleDeadline(self):
+        if self.server.turnDeadline is None:
+            return
+        if self.deadline is not None:
+            self.deadline.cancel()
+        self.deadline = asyncio.get_running_loop().call_later(self.server.turnDeadline, self.queue.put_nowait,
+                                                              ('deadline', None, self.round))
+
+    def state(self, player: str) -> dict:
+        state = self.game.getGameData(player)
+        if self.deltaEncoder is not None:
+            state = self.deltaEncoder.encode(player, state)
+        return state
+
+    def publishStates(self, players):
+        if self.server.batchState:
+            states = {player: self.state(player) for player in players}
+            self.server.publish(f'games/{self.name}/game_state', self.server.serializer.dumps(states))
+        else:
+            for player in players:
+                self.server.publish(f'games/{self.name}/{player}/game_state', self.server.serializer.dumps(self.state(player)))
+
+    def close(self) -> bool:
+        if self.deadline is not None:
+            self.deadline.cancel()
+        if self.ticker is not None:
+            self.ticker.cancel()
+        self.server.lobbies.pop(self.name, None)
+        return True
+
+    def publish(self, msg: str):
+        self.server.publish(f"games/{self.name}/lobby", msg)
+
+    def publishError(self, error: str):
+        self.publish(f"Error: {error}")
+
+
+class AsyncGameServer:
+    def __init__(self, publish: Callable[[str, str], None], mapPool: Optional[MapPool] = None, verbose: bool = False,
+                 batchState: bool = False, serializer: Serializer = JSON, deltaState: bool = False,
+                 turnDeadline: Optional[float] = None, tickRate: Optional[float] = None):
+        """
+        :param publish: Called with (topic, payload) for every outgoing message. Must not block.
+        :param mapPool: Optional pool of pre-generated maps, see MapPool
+        :param verbose: Print maps after every round. Printing runs in a worker thread on a map snapshot.
+        :param batchState: Publish one games/{lobby}/game_state message per round keyed by player name
+                           instead of one message per player
+        :param serializer: Encoder for state and score payloads, see serializer.py
+        :param deltaState: Send each player a keyframe and then only window changes, see deltaStream.py
+        :param turnDeadline: Seconds after which a round resolves with the moves that arrived. None waits for every player.
+                             Deadlines use the event loop's timer heap, so there is no thread per lobby.
+        :param tickRate: Run lobbies in real time, advancing tickRate times per second with the latest move of
+                         each player instead of waiting for everyone. See realtime.py.
+        """
+        self.publish = publish
+        self.mapPool = mapPool
+        self.verbose = verbose
+        self.batchState = batchState
+        self.serializer = serializer
+        self.deltaState = deltaState
+        self.turnDeadline = turnDeadline
+        self.tickRate = tickRate
+        self.tickStats = None if tickRate is None else TickStats(1 / tickRate) # Shared by every real-time lobby
+        self.lobbies: dict[str, Lobby] = {}
+        self.messages = 0
+        self.__tasks = set()
+
+    async def serve(self, inbox: asyncio.Queue):
+        """
+        Dispatches (topic, payload) messages from inbox to their lobby until cancelled
+        """
+        while True:
+            topic, payload = await inbox.get()
+            self.dispatch(topic, payload)
+
+    def dispatch(self, topic: str, payload: bytes):
+        self.messages += 1
+        topic_list = topic.split("/")
+        route = topic_list[-1]
+        if route == 'new_game':
+            try:
+                player = NewPlayer(**json.loads(payload))
+            except Exception:
+                print("ValidationError in create_game")
+                return
+            self.lobby(player.lobby_name).queue.put_nowait((route, topic_list, player))
+        elif route == 'start' and len(topic_list) == 3:
+            self.lobby(topic_list[1]).queue.put_nowait((route, topic_list, payload))
+        elif route == 'move' and len(topic_list) == 4:
+            lobby = self.lobbies.get(topic_list[1])
+            if lobby is None:
+                self.publish(f"games/{topic_list[1]}/lobby", "Error: Lobby name not found.")
+                return
+            lobby.queue.put_nowait((route, topic_list, payload))
+        elif route == 'resync' and len(topic_list) == 4:
+            lobby = self.lobbies.get(topic_list[1])
+            if lobby is not None:
+                lobby.queue.put_nowait((route, topic_list, payload))
+
+    def lobby(self, name: str) -> Lobby:
+        lobby = self.lobbies.get(name)
+        if lobby is None:
+            lobby = self.lobbies[name] = Lobby(self, name)
+            self.__track(asyncio.create_task(lobby.run(), name=f'lobby-{name}'))
+        return lobby
+
+    def showMap(self, game: Game):
+        if self.verbose:
+            snapshot = game.map.snapshot()
+            self.__track(asyncio.create_task(asyncio.to_thread(lambda: print(snapshot))))
+
+    def __track(self, task: asyncio.Task):
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+
+async def runBroker(**options):
+    loop = asyncio.get_running_loop()
+    inbox = asyncio.Queue()
+
+    client = connectBroker("AsyncGameClient")
+    # paho calls back on its network thread, hand messages over to the event loop
+    client.on_message = lambda client, userdata, msg: loop.call_soon_threadsafe(inbox.put_nowait, (msg.topic, msg.payload))
+
+    client.subscribe("new_game")
+    client.subscribe('games/+/start')
+    client.subscribe('games/+/+/move')
+    client.subscribe('games/+/+/resync')
+
+    server = AsyncGameServer(client.publish, MapPool([(10, 10, numPlayers) for numPlayers in range(2, 9)]), **options)
+    client.loop_start()
+    try:
+        await server.serve(inbox)
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+
+async def runLoopback(numLobbies: int, numPlayers: int, seconds: float, **options):
+    """
+    Drives the server in-process with random bots that answer every game_state with a move
+    """
+    inbox = asyncio.Queue()
+    moves = [move.name for move in Moveset]
+
+    def publish(topic: str, payload: str):
+        if topic.endswith('/game_state'):
+            topic_list = topic.split('/')
+            lobby_name = topic_list[1]
+            players = decode(payload).keys() if len(topic_list) == 3 else (topic_list[2],)
+            for player_name in players:
+                inbox.put_nowait((f'games/{lobby_name}/{player_name}/move', random.choice(moves).encode()))
+        elif topic.endswith('/lobby') and payload.startswith('Game Over'):
+            startLobby()
+
+    def startLobby():
+        lobby_name = f'Lobby{next(lobbyIds)}'
+        for i in range(numPlayers):
+            inbox.put_nowait(('new_game', json.dumps({'lobby_name': lobby_name,
+                                                      'team_name': f'Team{i % 2}',
+                                                      'player_name': f'Player{i}'}).encode()))
+        inbox.put_nowait((f'games/{lobby_name}/start', b'START'))
+
+    lobbyIds = itertools.count()
+    server = AsyncGameServer(publish, **options)
+    for _ in range(numLobbies):
+        startLobby()
+
+    serving = asyncio.create_task(server.serve(inbox))
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    serving.cancel()
+    print(f'{server.messages} messages in {elapsed:.2f}s: {server.messages / elapsed:.0f} messages/s')
+    if server.tickStats is not None:
+        print(server.tickStats)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loopback', action='store_true', help='run in-process with random bots instead of a broker')
+    parser.add_argument('--lobbies', type=int, default=100)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--verbose', action='store_true', help='print every map after each round')
+    parser.add_argument('--batch', action='store_true', help='publish one game_state message per lobby per round')
+    parser.add_argument('--serializer', default=None, help='json, orjson, msgpack or fastest')
+    parser.add_argument('--delta', action='store_true', help='delta encode game_state messages')
+    parser.add_argument('--deadline', type=float, default=None, help='turn deadline in seconds')
+    parser.add_argument('--tick-rate', type=float, default=None, help='run lobbies in real time at this many ticks per second')
+    args = parser.parse_args()
+
+    options = dict(verbose=args.verbose, batchState=args.batch, serializer=getSerializer(args.serializer), deltaState=args.delta,
+                   turnDeadline=args.deadline, tickRate=args.tick_rate)
+    if args.loopback:
+        asyncio.run(runLoopback(args.lobbies, args.players, args.seconds, **options))
+    else:
+        asyncio.run(runBroker(**options))
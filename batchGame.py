@@ -0,0 +1,279 @@
+"""
+Vectorized batch of games for training and evaluating bots. Holds numGames independent games with the rules of
+game.Game as stacked numpy arrays and steps all of them with one (numGames, numPlayers) move array:
+
+    cells       (K, H+2p, W+2p) int8 CellKind grid, padded with OFFBOARD so moves off the board are blocked
+                like moves into walls without a bounds check
+    xs, ys      (K, P) player positions, cells only say PLAYER and which player it is comes from these
+    scores      (K, T) team scores
+    numCoins    (K,) coins left, a game is done when it reaches 0
+
+walls and coinValues give the board as wall masks and coin values per cell.
+
+A game built from seed s is the same game as Game(playerNames, width, height, seed=s), boards are generated
+by Map. Moves are applied in player order within a round, which is the order Game.applyMoves gets them from
+simulate.py, so a batch game plays out exactly like the Game object would.
+
+    python batchGame.py --games 4096 --steps 200
+"""
+
+import argparse
+import time
+from typing import Optional, Union
+
+import numpy as np
+
+from game import Game
+from gameItems import CellKind
+from map import Map
+from moveset import Moveset
+from player import Player
+
+# Move codes of the move array, 0 keeps a player where it is
+MOVES = (None,) + tuple(Moveset)
+DX = np.array([0] + [move.value[0] for move in Moveset], dtype=np.int32)
+DY = np.array([0] + [move.value[1] for move in Moveset], dtype=np.int32)
+
+# Observation codes: CellKind codes for empty cells, walls and coins, players split by whose window it is
+TEAMMATE = 5
+ENEMY = 6
+SELF = 7
+OFFBOARD = -1
+
+# Points for stepping onto a cell of each kind, -1 when the cell blocks the move. Indexed by CellKind code,
+# OFFBOARD (-1) picks the last entry.
+STEP_VALUE = np.array([0, -1, 1, 2, 3, -1, -1], dtype=np.int32)
+
+OBSERVATION_KEYS = {CellKind.WALL: 'walls', CellKind.COIN1: 'coin1', CellKind.COIN2: 'coin2',
+                    CellKind.COIN3: 'coin3', ENEMY: 'enemyPositions'}
+
+
+def moveCode(move: Optional[Moveset]) -> int:
+    return MOVES.index(move)
+
+
+class BatchGame:
+    def __init__(self, playerNames: dict[str, list[str]], numGames: int, width: int = 10, height: int = 10,
+                 visionRadius: int = 2, seed: int = 0):
+        """
+        :param playerNames: Dictionary for each team name with a list of player names, the same for every game
+        :param seed: Game i starts from seed+i, games reset later take the following seeds
+        """
+        assert numGames > 0 and visionRadius >= 0
+        self.teamNames = list(playerNames)
+        self.names = [name for players in playerNames.values() for name in players]
+        self.teamIds = np.array([team for team, players in enumerate(playerNames.values()) for _ in players], dtype=np.int32)
+        self.numGames = numGames
+        self.numPlayers = len(self.names)
+        self.height = height
+        self.width = width
+        self.visionRadius = visionRadius
+        self.pad = max(visionRadius, 1)
+
+        self.cells = np.full((numGames, height + 2 * self.pad, width + 2 * self.pad), OFFBOARD, dtype=np.int8)
+        self.xs = np.zeros((numGames, self.numPlayers), dtype=np.int32)
+        self.ys = np.zeros((numGames, self.numPlayers), dtype=np.int32)
+        self.scores = np.zeros((numGames, len(self.teamNames)), dtype=np.int32)
+        self.numCoins = np.zeros(numGames, dtype=np.int32)
+        self.turns = np.zeros(numGames, dtype=np.int32)
+        self.seeds = np.zeros(numGames, dtype=np.int64)
+        self.done = np.zeros(numGames, dtype=bool)
+        self.nextSeed = seed
+        # What player q looks like in player p's window, (P, P) observation codes
+        sameTeam = self.teamIds[:, None] == self.teamIds[None, :]
+        self.__seenAs = np.where(sameTeam, TEAMMATE, ENEMY).astype(np.int8)
+        np.fill_diagonal(self.__seenAs, SELF)
+        # Flat index of every window cell relative to the window's top left corner
+        size, rowLength = 2 * visionRadius + 1, width + 2 * self.pad
+        self.__window = (np.arange(size)[:, None] * rowLength + np.arange(size)[None, :]).ravel()
+        self.__players = [Player(name, None) for name in self.names]
+        self.reset()
+
+    def reset(self, games: Union[np.ndarray, list[int], None] = None):
+        """
+        Starts new games on the next seeds
+        :param games: Indexes or a boolean mask of the games to reset, all of them by default. env.reset(env.done)
+                      keeps every slot busy.
+        """
+        indexes = np.arange(self.numGames) if games is None else np.asarray(games)
+        if indexes.dtype == bool:
+            indexes = np.flatnonzero(indexes)
+        pad, height, width = self.pad, self.height, self.width
+        for game in indexes:
+            board = Map(height, width, self.__players, arrayBacked=True, seed=self.nextSeed)
+            self.cells[game, pad:pad + height, pad:pad + width] = board.kinds
+            for id, player in enumerate(self.__players):
+                self.xs[game, id], self.ys[game, id] = player.loc
+            self.numCoins[game] = board.numCoins
+            self.seeds[game] = self.nextSeed
+            self.nextSeed += 1
+        self.scores[indexes] = 0
+        self.turns[indexes] = 0
+        self.done[indexes] = False
+
+    def step(self, moves: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Plays one round of every game that is not done. Observations are left to observe() so games that
+        finished can be reset first.
+        :param moves: (numGames, numPlayers) move codes, see MOVES
+        :return: ((numGames, numTeams) score gained this round, done)
+        """
+        moves = np.asarray(moves)
+        assert moves.shape == (self.numGames, self.numPlayers)
+        cells, xs, ys, pad = self.cells, self.xs, self.ys, self.pad
+        rewards = np.zeros(self.scores.shape, dtype=np.int32)
+        active = ~self.done
+
+        # One vectorized pass per player keeps Game.applyMoves' in-order resolution, a player can step into a
+        # cell vacated earlier in the round but not into one vacated later
+        for id in range(self.numPlayers):
+            codes = moves[:, id]
+            games = np.flatnonzero(active & (codes != 0))
+            if not games.size:
+                continue
+            codes = codes[games]
+            fromX, fromY = xs[games, id] + pad, ys[games, id] + pad
+            toX, toY = fromX + DX[codes], fromY + DY[codes]
+            values = STEP_VALUE[cells[games, toX, toY]]
+            moved = values >= 0
+            games, values = games[moved], values[moved]
+            fromX, fromY, toX, toY = fromX[moved], fromY[moved], toX[moved], toY[moved]
+
+            rewards[games, self.teamIds[id]] += values
+            self.numCoins[games] -= values > 0
+            cells[games, fromX, fromY] = CellKind.EMPTY
+            cells[games, toX, toY] = CellKind.PLAYER
+            xs[games, id], ys[games, id] = toX - pad, toY - pad
+
+        self.scores += rewards
+        self.turns += active
+        self.done = self.numCoins <= 0
+        return rewards, self.done.copy()
+
+    def observe(self) -> dict:
+        """
+        Every player's getGameData at once:
+            window: (numGames, numPlayers, 2r+1, 2r+1) int8 observation codes centered on the player, SELF in the
+                    middle, OFFBOARD outside the board
+            position: (numGames, numPlayers, 2) currentPosition
+        See gameData for one of them decoded into Game.getGameData's dictionary.
+        """
+        radius, size = self.visionRadius, 2 * self.visionRadius + 1
+        numGames, height, width = self.cells.shape
+        # Flat index of each window's top left corner, the padding keeps every window inside its own game
+        corners = (np.arange(numGames)[:, None] * height + self.xs + self.pad - radius) * width \
+            + self.ys + self.pad - radius
+        window = self.cells.take(corners[:, :, None] + self.__window).reshape(numGames, self.numPlayers, size, size)
+
+        # Every PLAYER cell in a window is one of the players, so they are placed from the positions instead of
+        # looking up each cell. dx, dy: (game, observer, other) offset of other in observer's window, negative
+        # offsets wrap around to large unsigned ones so one comparison checks both ends.
+        numPlayers = self.numPlayers
+        dx = self.xs[:, None, :] - self.xs[:, :, None] + radius
+        dy = self.ys[:, None, :] - self.ys[:, :, None] + radius
+        pairs = np.flatnonzero((dx.view(np.uint32) < size) & (dy.view(np.uint32) < size))
+        # pairs // numPlayers is game * numPlayers + observer, pairs % numPlayers**2 is observer * numPlayers + other
+        window.reshape(-1)[pairs // numPlayers * (size * size) + dx.ravel()[pairs] * size + dy.ravel()[pairs]] = \
+            self.__seenAs.ravel()[pairs % (numPlayers * numPlayers)]
+        return {'window': window, 'position': np.stack((self.xs, self.ys), axis=-1)}
+
+    def gameData(self, observation: dict, game: int, player: int) -> dict:
+        """
+        :return: One player's observation as the dictionary Game.getGameData returns for them
+        """
+        radius = self.visionRadius
+        x, y = (int(value) for value in observation['position'][game, player])
+        gameData = {'teammateNames': [],
+                    'teammatePositions': [],
+                    'enemyPositions': [],
+                    'currentPosition': (x, y),
+                    'coin1': [],
+                    'coin2': [],
+                    'coin3': [],
+                    'walls': []}
+        teammates = {tuple(int(value) for value in observation['position'][game, other]): self.names[other]
+                     for other in range(self.numPlayers)
+                     if other != player and self.teamIds[other] == self.teamIds[player]}
+
+        window = observation['window'][game, player]
+        for i, j in zip(*np.nonzero((window != CellKind.EMPTY) & (window != OFFBOARD) & (window != SELF))):
+            loc = (x + int(i) - radius, y + int(j) - radius)
+            code = window[i, j]
+            if code == TEAMMATE:
+                gameData['teammateNames'].append(teammates[loc])
+                gameData['teammatePositions'].append(loc)
+            else:
+                gameData[OBSERVATION_KEYS[code]].append(loc)
+        return gameData
+
+    @property
+    def kinds(self) -> np.ndarray:
+        """
+        :return: (numGames, height, width) view of the CellKind grids without the padding
+        """
+        pad = self.pad
+        return self.cells[:, pad:pad + self.height, pad:pad + self.width]
+
+    @property
+    def walls(self) -> np.ndarray:
+        return self.kinds == CellKind.WALL
+
+    @property
+    def coinValues(self) -> np.ndarray:
+        """
+        :return: (numGames, height, width) value of the coin on each cell, 0 where there is none
+        """
+        kinds = self.kinds
+        return np.where((kinds >= CellKind.COIN1) & (kinds <= CellKind.COIN3), kinds - CellKind.COIN1 + 1, 0)
+
+
+def benchGames(playerNames: dict[str, list[str]], steps: int, size: int, seed: int) -> float:
+    """
+    The same workload one Game at a time: applyMoves and getGameData for every player, a new game when one ends
+    :return: Game steps per second
+    """
+    rng = np.random.default_rng(seed)
+    names = [name for players in playerNames.values() for name in players]
+    game = Game(playerNames, size, size, seed=seed)
+    start = time.perf_counter()
+    for turn in range(steps):
+        codes = rng.integers(0, len(MOVES), len(names))
+        game.applyMoves([(name, MOVES[code]) for name, code in zip(names, codes) if code])
+        for name in names:
+            game.getGameData(name)
+        if game.gameOver():
+            game = Game(playerNames, size, size, seed=seed + turn + 1)
+    return steps / (time.perf_counter() - start)
+
+
+def benchBatch(playerNames: dict[str, list[str]], numGames: int, steps: int, size: int, seed: int) -> float:
+    """
+    :return: Game steps per second of a BatchGame with observations, finished games are reset every step
+    """
+    rng = np.random.default_rng(seed)
+    env = BatchGame(playerNames, numGames, size, size, seed=seed)
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, done = env.step(rng.integers(0, len(MOVES), (numGames, env.numPlayers), dtype=np.int8))
+        if done.any():
+            env.reset(done)
+        env.observe()
+    return numGames * steps / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, nargs='+', default=[64, 1024, 4096], help='batch sizes')
+    parser.add_argument('--steps', type=int, default=200, help='rounds per batch')
+    parser.add_argument('--teams', type=int, default=2)
+    parser.add_argument('--players', type=int, default=2, help='players per team')
+    parser.add_argument('--size', type=int, default=10, help='board height and width')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    playerNames = {f'Team{i}': [f'Team{i}Player{j}' for j in range(args.players)] for i in range(args.teams)}
+    baseline = benchGames(playerNames, 5000, args.size, args.seed)
+    print(f'{"Game":>12} {baseline:12.0f} steps/s')
+    for numGames in args.games:
+        rate = benchBatch(playerNames, numGames, args.steps, args.size, args.seed)
+        print(f'{f"BatchGame {numGames}":>12} {rate:12.0f} steps/s {rate / baseline:8.1f}x')
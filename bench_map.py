@@ -0,0 +1,45 @@
+"""
+Benchmarks Map creation time for square boards from 10x10 up to 2000x2000.
+
+    python bench_map.py
+    python bench_map.py --sizes 10 100 1000 --repeat 5 --array
+"""
+
+import argparse
+import random
+import time
+
+from map import Map, np
+from player import Player
+
+
+def timeMap(size: int, numPlayers: int, repeat: int, arrayBacked: bool) -> float:
+    """
+    :return: Best creation time in seconds over repeat runs
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        players = [Player(f'Player{i}', None) for i in range(numPlayers)]
+        start = time.perf_counter()
+        Map(size, size, players, arrayBacked=arrayBacked)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 100, 500, 1000, 2000])
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--array', action='store_true', help='also time array-backed maps (needs numpy)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    layouts = [False, True] if args.array and np is not None else [False]
+
+    print(f'{"size":>11} {"layout":>7} {"seconds":>10}')
+    for size in args.sizes:
+        for arrayBacked in layouts:
+            seconds = timeMap(size, args.players, args.repeat, arrayBacked)
+            print(f'{f"{size}x{size}":>11} {"array" if arrayBacked else "list":>7} {seconds:>10.4f}')
@@ -0,0 +1,46 @@
+"""
+Micro-benchmark for move validation: the pydantic Move model against the InputTypes.parseMove lookup table.
+
+    python bench_moves.py --messages 1000000
+"""
+
+import argparse
+import random
+import time
+
+from InputTypes import Move, parseMove
+from moveset import Moveset
+
+
+def pydanticPath(payloads: list[bytes]):
+    for payload in payloads:
+        Moveset[Move(move=payload.decode()).move]
+
+
+def fastPath(payloads: list[bytes]):
+    for payload in payloads:
+        parseMove(payload)
+
+
+def messagesPerSecond(path, payloads: list[bytes], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        path(payloads)
+        best = min(best, time.perf_counter() - start)
+    return len(payloads) / best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = [random.choice(list(Moveset)).name.encode() for _ in range(args.messages)]
+
+    slow = messagesPerSecond(pydanticPath, payloads, args.repeat)
+    fast = messagesPerSecond(fastPath, payloads, args.repeat)
+    print(f'{"pydantic Move":>14} {slow:>14,.0f} messages/s')
+    print(f'{"parseMove":>14} {fast:>14,.0f} messages/s')
+    print(f'{"speedup":>14} {fast / slow:>13.1f}x')
@@ -0,0 +1,57 @@
+"""
+Micro-benchmark for resolving rounds: one Game.applyMoves call per round against a Game.movePlayer call per
+move. Both paths play the same rounds on identically seeded games.
+
+    python bench_rounds.py --players 8 --rounds 10000
+"""
+
+import argparse
+import random
+import time
+
+from game import Game
+from moveset import Moveset
+
+
+def movePlayerPath(game: Game, rounds: list):
+    for turn in rounds:
+        for name, move in turn:
+            game.movePlayer(name, move)
+
+
+def applyMovesPath(game: Game, rounds: list):
+    for turn in rounds:
+        game.applyMoves(turn)
+
+
+def movesPerSecond(paths: list, names: list[str], size: int, rounds: list, repeat: int) -> list[float]:
+    """
+    :return: Best moves/s of each path. Runs of the paths are interleaved so they see the same machine load.
+    """
+    best = [float('inf')] * len(paths)
+    for _ in range(repeat):
+        for i, path in enumerate(paths):
+            game = Game({'TeamA': names[::2], 'TeamB': names[1::2]}, size, size, seed=1)
+            start = time.perf_counter()
+            path(game, rounds)
+            best[i] = min(best[i], time.perf_counter() - start)
+    moves = sum(map(len, rounds))
+    return [moves / seconds for seconds in best]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--size', type=int, default=30)
+    parser.add_argument('--rounds', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=15)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    names = [f'Player{i}' for i in range(args.players)]
+    rounds = [[(name, rng.choice(list(Moveset))) for name in names] for _ in range(args.rounds)]
+
+    slow, fast = movesPerSecond([movePlayerPath, applyMovesPath], names, args.size, rounds, args.repeat)
+    print(f'{"movePlayer":>14} {slow:>14,.0f} moves/s')
+    print(f'{"applyMoves":>14} {fast:>14,.0f} moves/s')
+    print(f'{"speedup":>14} {fast / slow:>13.2f}x')
@@ -0,0 +1,109 @@
+"""
+Per-move cost in each validation mode (see validation.py). Every mode runs in its own interpreter because
+the mode is read when the game modules are imported. The modes are run --runs times, interleaved so they see
+the same machine load, and each call reports the median of those runs with their min-max spread. The last
+column is the median production/debug ratio of runs that were side by side.
+Map.get and Player.loc time the internal hot paths the mode strips checks from on their own, the Game calls
+also pay for everything else a move does.
+
+    python bench_validation.py --moves 200000 --runs 9
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+# (label, GAME_VALIDATION, extra interpreter flags)
+MODES = [('debug', 'debug', []),
+         ('production', 'production', []),
+         ('production -O', 'production', ['-O'])]
+
+
+def measure(numMoves: int, repeat: int) -> dict:
+    """
+    :return: Best nanoseconds per call of movePlayer, per move of applyMoves and per getGameData
+    """
+    from game import Game
+    from moveset import Moveset
+
+    names = [f'Player{i}' for i in range(4)]
+    rng = random.Random(1)
+    moves = [(rng.choice(names), rng.choice(list(Moveset))) for _ in range(numMoves)]
+    rounds = [list(zip(names, (rng.choice(list(Moveset)) for _ in names))) for _ in range(numMoves // len(names))]
+
+    def best(run) -> float:
+        times = []
+        for _ in range(repeat):
+            game = Game({'TeamA': names[::2], 'TeamB': names[1::2]}, 100, 100, seed=1)
+            start = time.perf_counter()
+            run(game)
+            times.append(time.perf_counter() - start)
+        return min(times) * 1e9 / numMoves
+
+    def movePlayer(game):
+        for name, move in moves:
+            game.movePlayer(name, move)
+
+    def applyMoves(game):
+        for turn in rounds:
+            game.applyMoves(turn)
+
+    def getGameData(game):
+        for name, _ in moves:
+            game.getGameData(name)
+
+    def mapGet(game):
+        get, loc = game.map.get, (50, 50)
+        for _ in moves:
+            get(loc)
+
+    def playerLoc(game):
+        player = game.getPlayer(names[0])
+        loc = player.loc
+        for _ in moves:
+            player.loc = loc
+
+    return {'movePlayer': best(movePlayer), 'applyMoves': best(applyMoves), 'getGameData': best(getGameData),
+            'Map.get': best(mapGet), 'Player.loc': best(playerLoc)}
+
+
+def run(flags: list[str], mode: str, numMoves: int, repeat: int) -> dict:
+    env = dict(os.environ, GAME_VALIDATION=mode)
+    out = subprocess.run([sys.executable, *flags, __file__, '--child', '--moves', str(numMoves), '--repeat', str(repeat)],
+                         env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--moves', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3, help='timings per interpreter, the best is kept')
+    parser.add_argument('--runs', type=int, default=7, help='interpreters per mode')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.moves, args.repeat)))
+        sys.exit()
+
+    # {label: [results of every run]}
+    results = {label: [] for label, _, _ in MODES}
+    for i in range(args.runs):
+        # Rotate which mode goes first so none of them always runs on a warmer or colder machine
+        for label, mode, flags in MODES[i % len(MODES):] + MODES[:i % len(MODES)]:
+            results[label].append(run(flags, mode, args.moves, args.repeat))
+
+    print(f'{"ns per call":>12}' + ''.join(f'{label:>24}' for label, _, _ in MODES) + f'{"production/debug":>18}')
+    for call in results['debug'][0]:
+        row = f'{call:>12}'
+        for label, _, _ in MODES:
+            times = [result[call] for result in results[label]]
+            row += f'{statistics.median(times):>8.0f} ({min(times):.0f}-{max(times):.0f})'.rjust(24)
+        ratio = statistics.median(production[call] / debug[call]
+                                  for debug, production in zip(results['debug'], results['production']))
+        print(row + f'{ratio:>17.2f}x')
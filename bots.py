@@ -0,0 +1,112 @@
+"""
+Bot strategies for headless play, see simulate.py. A strategy is a class built once per team per game with a
+random.Random, and called as bot(playerName, gameData) for every player of the team on every turn.
+gameData is a game_state payload as the MQTT clients receive it (lists, not tuples). A bot returns a move
+name, a Moveset, or None to stay put.
+"""
+
+import random
+from typing import Optional, Union
+
+from greedy import determine_next_move
+from moveset import Moveset
+from pathfinding import bfs
+from worldModel import WorldModel
+
+Move = Union[Moveset, str, None]
+
+
+class RandomBot:
+    def __init__(self, rng: random.Random, height: int = 10, width: int = 10):
+        self.rng = rng
+
+    def __call__(self, playerName: str, gameData: dict) -> Move:
+        return self.rng.choice(('UP', 'DOWN', 'LEFT', 'RIGHT'))
+
+
+class GreedyBot:
+    """
+    determine_next_move from greedy.py: step towards the closest visible coin, otherwise the first move
+    that is not into a wall
+    """
+
+    def __init__(self, rng: random.Random, height: int = 10, width: int = 10):
+        pass
+
+    def __call__(self, playerName: str, gameData: dict) -> Move:
+        return determine_next_move(playerName, gameData)
+
+
+class ExplorerBot:
+    """
+    The heuristic of PlayerClient_challenge3.py: every player prefers, in its own direction order, a cell
+    that is on the board, not a known wall, not taken by another player and not explored yet, then any
+    cell that is on the board and not a wall. The team shares what it has seen.
+    """
+    ORDERS = (('UP', 'DOWN', 'RIGHT', 'LEFT'),
+              ('DOWN', 'RIGHT', 'UP', 'LEFT'),
+              ('RIGHT', 'UP', 'DOWN', 'LEFT'),
+              ('LEFT', 'DOWN', 'RIGHT', 'UP'))
+
+    def __init__(self, rng: random.Random, height: int = 10, width: int = 10):
+        self.world = WorldModel(height, width)
+        self.visited: dict[str, set] = {}
+        self.orders: dict[str, tuple] = {}
+
+    def __call__(self, playerName: str, gameData: dict) -> Move:
+        world = self.world
+        world.update(gameData, playerName)
+        x, y = world.position
+        visited = self.visited.setdefault(playerName, set())
+        visited.add((x, y))
+        order = self.orders.setdefault(playerName, ExplorerBot.ORDERS[len(self.orders) % len(ExplorerBot.ORDERS)])
+
+        players = world.enemies | {loc for name, (loc, _) in world.teammates.items() if name != playerName}
+        fallback = None
+        for name in order:
+            dx, dy = Moveset[name].value
+            loc = (x + dx, y + dy)
+            if not (0 <= loc[0] < world.height and 0 <= loc[1] < world.width) or loc in world.walls:
+                continue
+            if loc not in players and loc not in visited:
+                return name
+            if fallback is None:
+                fallback = name
+        return fallback if fallback is not None else order[-1]
+
+
+class PathBot:
+    """
+    Plans on a shared WorldModel with pathfinding.bfs: walk to the nearest remembered coin, preferring higher
+    values when they are about as close, and explore the nearest unknown cell when no coin is known.
+    """
+
+    def __init__(self, rng: random.Random, height: int = 10, width: int = 10):
+        self.rng = rng
+        self.world = WorldModel(height, width)
+
+    def __call__(self, playerName: str, gameData: dict) -> Move:
+        world = self.world
+        world.update(gameData, playerName)
+        blocked = world.blocked()
+        blocked.discard(world.position)
+        for minValue in (3, 2, 1):
+            goals = {loc for loc, (value, _) in world.coins.items() if value >= minValue}
+            path = bfs(world.position, goals, world.height, world.width, blocked) if goals else None
+            # A better coin is only worth a detour of a couple of steps
+            if path and (minValue == 1 or len(path) <= 2 * minValue):
+                return path[0]
+        unknown = {(x, y) for x in range(world.height) for y in range(world.width) if not world.known((x, y))}
+        path = bfs(world.position, unknown, world.height, world.width, blocked) if unknown else None
+        if path:
+            return path[0]
+        return self.rng.choice(list(Moveset))
+
+
+STRATEGIES = {'random': RandomBot, 'greedy': GreedyBot, 'explorer': ExplorerBot, 'path': PathBot}
+
+
+def toMove(move: Move) -> Optional[Moveset]:
+    if move is None or isinstance(move, Moveset):
+        return move
+    return Moveset[move]
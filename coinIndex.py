@@ -0,0 +1,134 @@
+from map import Map, COIN_KINDS
+from typing import Optional
+
+
+class CoinIndex:
+    """
+    Bucketed grid of the coins on a map. The board is cut into bucketSize x bucketSize buckets, each holding
+    {loc: value} for its coins, with one grid per coin value so "value >= k" only looks at the grids it needs.
+    Nearest-coin queries search rings of buckets outwards from the query point and stop as soon as no
+    unvisited bucket can hold anything closer, so they touch a few buckets instead of every coin.
+    The index has to be told about every coin that leaves the board, see remove.
+    """
+
+    def __init__(self, height: int, width: int, bucketSize: int = 8):
+        assert isinstance(bucketSize, int) and bucketSize > 0
+        self.height = height
+        self.width = width
+        self.bucketSize = bucketSize
+        self.__buckets: dict[int, dict[tuple[int, int], dict[tuple[int, int], int]]] = {value: {} for value in COIN_KINDS.values()}
+        self.__counts = {value: 0 for value in COIN_KINDS.values()}
+
+    @classmethod
+    def fromMap(cls, map: Map, bucketSize: int = 8) -> 'CoinIndex':
+        index = cls(map.height, map.width, bucketSize)
+        if map.arrayBacked:
+            kinds = map.kinds
+            for kind, value in COIN_KINDS.items():
+                for x, y in zip(*(kinds == kind).nonzero()):
+                    index.add((int(x), int(y)), value)
+        else:
+            for x, row in enumerate(map.map):
+                for y, cell in enumerate(row):
+                    if cell is not None and cell.kind in COIN_KINDS:
+                        index.add((x, y), COIN_KINDS[cell.kind])
+        return index
+
+    def __len__(self):
+        return sum(self.__counts.values())
+
+    def count(self, minValue: int = 1) -> int:
+        return sum(count for value, count in self.__counts.items() if value >= minValue)
+
+    def add(self, loc: tuple[int, int], value: int):
+        bucket = self.__buckets[value].setdefault(self.__bucketOf(loc), {})
+        if loc not in bucket:
+            self.__counts[value] += 1
+        bucket[loc] = value
+
+    def remove(self, loc: tuple[int, int]) -> Optional[int]:
+        """
+        :return: Value of the coin that was on loc, None if there was none
+        """
+        key = self.__bucketOf(loc)
+        for value, grid in self.__buckets.items():
+            bucket = grid.get(key)
+            if bucket is not None and loc in bucket:
+                del bucket[loc]
+                if not bucket:
+                    del grid[key]
+                self.__counts[value] -= 1
+                return value
+        return None
+
+    def valueAt(self, loc: tuple[int, int]) -> Optional[int]:
+        key = self.__bucketOf(loc)
+        for value, grid in self.__buckets.items():
+            bucket = grid.get(key)
+            if bucket is not None and loc in bucket:
+                return value
+        return None
+
+    def nearest(self, loc: tuple[int, int], minValue: int = 1) -> Optional[tuple[tuple[int, int], int]]:
+        """
+        Nearest coin by Manhattan distance, the number of moves on an open board. Ties go to the smallest (x,y).
+        :return: ((x,y), value), None if no coin of at least minValue is left
+        """
+        grids = [grid for value, grid in self.__buckets.items() if value >= minValue and grid]
+        if not grids:
+            return None
+        size = self.bucketSize
+        x, y = loc
+        bx, by = self.__bucketOf(loc)
+        maxRing = max(bx, by, (self.height - 1) // size - bx, (self.width - 1) // size - by)
+
+        best = None
+        for ring in range(maxRing + 1):
+            for key in CoinIndex.__ring(bx, by, ring):
+                for grid in grids:
+                    bucket = grid.get(key)
+                    if bucket is None:
+                        continue
+                    for (cx, cy), value in bucket.items():
+                        candidate = (abs(cx - x) + abs(cy - y), (cx, cy), value)
+                        if best is None or candidate < best:
+                            best = candidate
+            # Coins in the next ring are more than ring*size cells away along one axis
+            if best is not None and best[0] <= ring * size:
+                break
+        return None if best is None else (best[1], best[2])
+
+    def inRect(self, minX: int, minY: int, maxX: int, maxY: int, minValue: int = 1) -> list[tuple[tuple[int, int], int]]:
+        """
+        :return: [((x,y), value), ...] for the coins of at least minValue with minX <= x <= maxX and minY <= y <= maxY,
+                 in row-major order
+        """
+        size = self.bucketSize
+        coins = []
+        for value, grid in self.__buckets.items():
+            if value < minValue or not grid:
+                continue
+            for bx in range(max(minX, 0) // size, min(maxX, self.height - 1) // size + 1):
+                for by in range(max(minY, 0) // size, min(maxY, self.width - 1) // size + 1):
+                    bucket = grid.get((bx, by))
+                    if bucket is None:
+                        continue
+                    coins.extend(((cx, cy), value) for cx, cy in bucket
+                                 if minX <= cx <= maxX and minY <= cy <= maxY)
+        coins.sort()
+        return coins
+
+    def __bucketOf(self, loc: tuple[int, int]) -> tuple[int, int]:
+        return loc[0] // self.bucketSize, loc[1] // self.bucketSize
+
+    @staticmethod
+    def __ring(bx: int, by: int, ring: int):
+        if ring == 0:
+            yield bx, by
+            return
+        for dy in range(-ring, ring + 1):
+            yield bx - ring, by + dy
+            yield bx + ring, by + dy
+        for dx in range(-ring + 1, ring):
+            yield bx + dx, by - ring
+            yield bx + dx, by + ring
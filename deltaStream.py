@@ -0,0 +1,119 @@
+"""
+Delta encoding for the game_state stream. Instead of a full getGameData snapshot every round, a player gets
+one keyframe and after that only the cells that entered, left or changed in their vision window.
+
+Every message is {'seq': n, 'key': bool, 'pos': [x, y], 'set': [[x, y, kind(, teammateName)], ...], 'clear': [[x, y], ...]}
+where kind is one of '1', '2', '3' (coins), 'w' (wall), 't' (teammate, followed by the name) or 'e' (enemy).
+Keyframes carry the whole window in 'set'. A keyframe is resent every keyframeInterval messages, and a client
+whose decoder lost track publishes on games/{lobby}/{player}/resync to get one straight away. Without that a
+client waiting for a keyframe would never move, and in lockstep mode the round and its keyframe would never come.
+"""
+
+from typing import Optional
+
+# gameData list -> cell kind code
+KEY_TO_KIND = {'coin1': '1', 'coin2': '2', 'coin3': '3', 'walls': 'w', 'enemyPositions': 'e'}
+KIND_TO_KEY = {kind: key for key, kind in KEY_TO_KIND.items()}
+KIND_TO_KEY['t'] = 'teammatePositions'
+
+
+def windowCells(gameData: dict) -> dict[tuple[int, int], tuple]:
+    """
+    :return: {(x, y): (kind,) or ('t', teammateName)} for every non-empty cell in a getGameData dict
+    """
+    cells = {}
+    for key, kind in KEY_TO_KIND.items():
+        for x, y in gameData[key]:
+            cells[x, y] = (kind,)
+    for (x, y), name in zip(gameData['teammatePositions'], gameData['teammateNames']):
+        cells[x, y] = ('t', name)
+    return cells
+
+
+class DeltaEncoder:
+    """
+    Server side, one per lobby. Remembers the last window sent to every player.
+    """
+
+    def __init__(self, keyframeInterval: int = 20):
+        assert isinstance(keyframeInterval, int) and keyframeInterval > 0
+        self.keyframeInterval = keyframeInterval
+        self.__sent: dict[str, dict] = {}
+        self.__seq: dict[str, int] = {}
+
+    def encode(self, playerName: str, gameData: dict) -> dict:
+        cells = windowCells(gameData)
+        seq = self.__seq.get(playerName, -1) + 1
+        self.__seq[playerName] = seq
+        previous = self.__sent.get(playerName)
+        self.__sent[playerName] = cells
+
+        pos = list(gameData['currentPosition'])
+        if previous is None or seq % self.keyframeInterval == 0:
+            return {'seq': seq, 'key': True, 'pos': pos,
+                    'set': [[x, y, *cell] for (x, y), cell in cells.items()], 'clear': []}
+
+        return {'seq': seq, 'key': False, 'pos': pos,
+                'set': [[x, y, *cell] for (x, y), cell in cells.items() if previous.get((x, y)) != cell],
+                'clear': [[x, y] for (x, y) in previous if (x, y) not in cells]}
+
+    def keyframe(self, playerName: str):
+        """
+        Forces the next message for playerName to be a keyframe
+        """
+        self.__sent.pop(playerName, None)
+
+
+class DeltaDecoder:
+    """
+    Client side, one per player stream. Rebuilds getGameData dicts from keyframes and deltas.
+    """
+
+    def __init__(self):
+        self.__cells: Optional[dict[tuple[int, int], tuple]] = None
+        self.__seq: Optional[int] = None
+
+    def decode(self, message: dict) -> Optional[dict]:
+        """
+        :return: The full game data, or None while waiting for a keyframe after a missed message, which the
+                 client should ask for on its resync topic
+        """
+        if message['key']:
+            self.__cells = {}
+        elif self.__cells is None or message['seq'] != self.__seq + 1:
+            self.__cells = None
+            return None
+        self.__seq = message['seq']
+
+        cells = self.__cells
+        for x, y in message['clear']:
+            cells.pop((x, y), None)
+        for x, y, *cell in message['set']:
+            cells[x, y] = tuple(cell)
+
+        gameData = {'teammateNames': [],
+                    'teammatePositions': [],
+                    'enemyPositions': [],
+                    'currentPosition': list(message['pos']),
+                    'coin1': [],
+                    'coin2': [],
+                    'coin3': [],
+                    'walls': []}
+        for (x, y) in sorted(cells):
+            cell = cells[x, y]
+            gameData[KIND_TO_KEY[cell[0]]].append([x, y])
+            if cell[0] == 't':
+                gameData['teammateNames'].append(cell[1])
+        return gameData
+
+
+def decodeState(decoders: dict[str, DeltaDecoder], playerName: str, state: dict) -> Optional[dict]:
+    """
+    Passes full game_state payloads through and rebuilds delta-encoded ones with the player's decoder
+    """
+    if 'seq' not in state:
+        return state
+    decoder = decoders.get(playerName)
+    if decoder is None:
+        decoder = decoders[playerName] = DeltaDecoder()
+    return decoder.decode(state)
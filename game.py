@@ -2,25 +2,41 @@
 Author: Charles Lee
 """
 
-from map import Map
+from map import Map, COIN_KINDS
 from moveset import Moveset
 from player import Player
 from team import Team
+from vision import VisionIndex
+from coinIndex import CoinIndex
 from gameItems import *
+from typing import Iterable, Optional, Union
 import random
 
 class Game:
-    def __init__(self, playerNames: dict[str,list[str]], width: int = 10, height: int = 10):
+    def __init__(self, playerNames: dict[str,list[str]], width: int = 10, height: int = 10, arrayBacked: bool = False,
+                 visionRadius: int = 2, seed: Union[int, random.Random, None] = None, premadeMap: Optional[Map] = None):
         """
         :param playerNames: Dictionary for each team name with a list of player names
+        :param arrayBacked: Store the map in numpy arrays instead of nested lists, see Map
+        :param visionRadius: Default vision radius for getGameData, kept up to date incrementally
+        :param seed: Integer seed or random.Random instance for map generation, see Map
+        :param premadeMap: Pre-generated map with one player slot per player, e.g. from MapPool. Overrides
+                           width, height, arrayBacked and seed.
         """
         self.numTeams = len(playerNames)
 
         self.teams, self.all_players = self.__initializePlayers(playerNames)
+        self.__players = list(self.all_players.values())
 
-        self.__height = height
-        self.__width = width
-        self.map = Map(height, width, list(self.all_players.values()))
+        if premadeMap is None:
+            self.map = Map(height, width, list(self.__players), arrayBacked=arrayBacked, seed=seed)
+        else:
+            premadeMap.replacePlayers(list(self.__players))
+            self.map = premadeMap
+        self.__height = self.map.height
+        self.__width = self.map.width
+        self.vision = VisionIndex(self.map, list(self.__players), visionRadius)
+        self.__coins: Optional[CoinIndex] = None
 
     def __initializePlayers(self, playerNames: dict[str,list[str]]):
         teams = {}
@@ -49,11 +65,93 @@ class Game:
 
         if isinstance(cell, Coin):
             player.team.increaseScore(cell.value)
-            self.map.decreaseCoin()
+            self.map.decreaseCoin(cell.value)
+            if self.__coins is not None:
+                self.__coins.remove(new_loc)
 
         self.map.set(player.loc, None)
         self.map.set(new_loc, player)
         player.loc = new_loc
+        self.vision.playerMoved(player, (x, y), new_loc)
+
+    def applyMoves(self, moves: Iterable[tuple[str, Moveset]]) -> dict:
+        """
+        Resolves a whole round in one pass. Moves are applied in order with the same rules as movePlayer,
+        so a player can step into a cell vacated earlier in the round. Each player moves at most once.
+        :param moves: (playerName, move) pairs
+        :return: {
+            cells: [((x,y), playerName or None), ...] in the order they changed, a later entry wins,
+            scores: {teamName: scoreDelta, ...},
+            coins: {teamName: coins collected this round, ...},
+            coinsCollected: int
+        }
+        """
+        allPlayers = self.all_players
+        height, width = self.__height, self.__width
+
+        # The whole round is looked up and checked before the board is touched. Each move costs one dict lookup
+        # and one isinstance here, instead of a getPlayer call, its asserts and an Enum value lookup.
+        movers = []
+        moved = set()
+        for playerName, move in moves:
+            player = allPlayers.get(playerName)
+            if player is None:
+                raise KeyError(f'{playerName} is not a valid player name')
+            moved.add(player)
+            assert isinstance(move, Moveset)
+            movers.append((player, move._value_))
+        if len(moved) != len(movers):
+            raise ValueError('A player can only move once per round')
+
+        step = self.map.step
+        changes = []
+        cells = []
+        scores = {}
+        coins = {}
+        coinsCollected = 0
+        for player, (dx, dy) in movers:
+            old_loc = player.loc
+            x, y = old_loc[0] + dx, old_loc[1] + dy
+            if not (0 <= x < height and 0 <= y < width):
+                continue
+            new_loc = x, y
+
+            # A single board call both reads the target and makes the move, nothing moves onto a wall or a player.
+            # CellKind.EMPTY is 0, so only walls, players and coins get past this.
+            kind = step(old_loc, new_loc)
+            if kind:
+                value = COIN_KINDS.get(kind)
+                if value is None:
+                    continue
+                team = player.team
+                team.increaseScore(value)
+                scores[team.name] = scores.get(team.name, 0) + value
+                coins[team.name] = coins.get(team.name, 0) + 1
+                coinsCollected += 1
+                self.map.decreaseCoin(value)
+                if self.__coins is not None:
+                    self.__coins.remove(new_loc)
+
+            player.loc = new_loc
+            changes.append((player, old_loc, new_loc))
+            cells.append((old_loc, None))
+            cells.append((new_loc, player.name))
+
+        self.vision.playersMoved(changes)
+        return {'cells': cells,
+                'scores': scores,
+                'coins': coins,
+                'coinsCollected': coinsCollected}
+
+    @property
+    def coins(self) -> CoinIndex:
+        """
+        Spatial index of the coins left on the board, for nearest-coin and rectangle queries. Built on first
+        use, then kept up to date as coins are collected.
+        """
+        if self.__coins is None:
+            self.__coins = CoinIndex.fromMap(self.map)
+        return self.__coins
 
     def getPlayer(self, playerName: str) -> Player:
         assert isinstance(playerName, str)
@@ -62,10 +160,11 @@ class Game:
         except KeyError:
             raise KeyError(f'{playerName} is not a valid player name')
 
-    def getGameData(self, playerName:str, visionRadius: int = 2) -> dict:
+    def getGameData(self, playerName:str, visionRadius: Optional[int] = None) -> dict:
         """
         :param playerName:
-        :param vision:
+        :param visionRadius: Defaults to the game's vision radius, which is served from the vision index.
+                             Any other radius rescans the window.
         :return: {
             teammateNames: [],
             teammatePositions: [(x,y),...],
@@ -77,9 +176,11 @@ class Game:
             walls: [(x,y),...]
         }
         """
-        assert isinstance(playerName, str)
-        assert isinstance(visionRadius, int)
         player = self.getPlayer(playerName)
+        if visionRadius is None or visionRadius == self.vision.visionRadius:
+            return self.vision.gameData(player)
+
+        assert isinstance(visionRadius, int)
         centerX, centerY = player.loc
         minX = max(centerX - visionRadius, 0)
         maxX = min(centerX + visionRadius, self.__height-1)
@@ -126,6 +227,16 @@ class Game:
             scores[teamName] = team.score
         return scores
 
+    def getCoinsLeft(self) -> dict:
+        """
+        :return: {coin1: n, coin2: n, coin3: n, value: total value left on the board}, without scanning the map
+        """
+        counts = self.map.coinCounts()
+        return {'coin1': counts[1],
+                'coin2': counts[2],
+                'coin3': counts[3],
+                'value': self.map.coinValue}
+
 
 if __name__ == '__main__':
     random.seed(1)
@@ -2,27 +2,54 @@
 Author: Charles Lee
 """
 
-from abc import abstractmethod
+from enum import IntEnum
 
-class Wall:
-    pass
 
-class Coin:
-    @abstractmethod
-    def value(self):
-        ...
+class CellKind(IntEnum):
+    """
+    Compact cell codes used by array-backed maps
+    """
+    EMPTY = 0
+    WALL = 1
+    COIN1 = 2
+    COIN2 = 3
+    COIN3 = 4
+    PLAYER = 5
+
+class Item:
+    """
+    Immutable board item. Every subclass has a single shared instance, so Coin1() always returns the same
+    object and a board holds references to a handful of flyweights instead of one object per cell.
+    """
+    __slots__ = ()
+    kind: CellKind
+
+    def __new__(cls):
+        instance = cls.__dict__.get('_instance')
+        if instance is None:
+            instance = super().__new__(cls)
+            cls._instance = instance
+        return instance
+
+class Wall(Item):
+    __slots__ = ()
+    kind = CellKind.WALL
+
+class Coin(Item):
+    __slots__ = ()
+    value: int
 
 class Coin1(Coin):
-    @property
-    def value(self):
-        return 1
+    __slots__ = ()
+    kind = CellKind.COIN1
+    value = 1
 
 class Coin2(Coin):
-    @property
-    def value(self):
-        return 2
+    __slots__ = ()
+    kind = CellKind.COIN2
+    value = 2
 
 class Coin3(Coin):
-    @property
-    def value(self):
-        return 3
\ No newline at end of file
+    __slots__ = ()
+    kind = CellKind.COIN3
+    value = 3
@@ -0,0 +1,74 @@
+"""
+The greedy coin strategy of mat_test.py, kept apart from the MQTT client so bots.py can use it offline.
+"""
+
+import copy
+
+
+def euclidean_distance(point1, point2):
+    x_diff = point1[0] - point2[0]
+    y_diff = point1[1] - point2[1]
+    return (x_diff ** 2 + y_diff ** 2) ** 0.5
+
+# Function to determine the next move based on the game state
+def determine_next_move(player_name, game_state):
+    # simple strategy that moves the player towards the closest coin using our pos dict
+    player_pos = game_state["currentPosition"]
+    all_coin_positions = game_state["coin1"] + game_state["coin2"] + game_state["coin3"]
+    # Get the list of wall positions
+    walls = game_state["walls"]
+
+    # Create a list of distances between the player's position and each coin's position
+    distances = []
+    for coin_pos in all_coin_positions:
+        distance = euclidean_distance(coin_pos, player_pos)
+        distances.append(distance)
+
+
+    next_position = copy.copy(player_pos)
+    #check that there is a coin within FOV
+    if not distances:
+        # Try to move in the following order: right, down, left, up
+        for direction in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+            temp_position = copy.copy(player_pos)
+            temp_position[0] += direction[0]
+            temp_position[1] += direction[1]
+            if temp_position not in walls:
+                next_position = temp_position
+                break
+    else:
+        # Find the minimum distance and get the corresponding coin's position
+        min_distance = min(distances)
+        min_distance_index = distances.index(min_distance)
+        closest_coin = all_coin_positions[min_distance_index]
+
+        
+        if closest_coin[0] > player_pos[0]:
+            next_position[0] += 1
+        elif closest_coin[0] < player_pos[0]:
+            next_position[0] -= 1
+        elif closest_coin[1] > player_pos[1]:
+            next_position[1] += 1
+        else:
+            next_position[1] -= 1
+        
+        # Check if the next position is a wall
+        if next_position in walls:
+            # If the next position is a wall, try other directions
+            for direction in [[-1, 0], [1, 0], [0, -1], [0, 1]]:
+                temp_position = copy.copy(player_pos)
+                temp_position[0] += direction[0]
+                temp_position[1] += direction[1]
+                if temp_position not in walls:
+                    next_position = temp_position
+                    break
+
+
+    if next_position[0] > player_pos[0]:
+        return "DOWN"
+    elif next_position[0] < player_pos[0]:
+        return "UP"
+    elif next_position[1] > player_pos[1]:
+        return "RIGHT"
+    else:
+        return "LEFT"
@@ -0,0 +1,200 @@
+"""
+Load generator for the game server. Keeps N lobbies of M synthetic bots busy, every bot answers each of its
+game_state messages with a move straight away, and a finished lobby is replaced by a new one. Reports
+rounds/s, messages/s, move-to-state latency percentiles and, in-process, RSS per lobby.
+
+    python loadgen.py --lobbies 200 --players 4 --seconds 10
+    python loadgen.py --transport broker --lobbies 20 --json results.json
+
+The loopback transport runs GameClient in this process on a LoopbackBroker (see transport.py). The broker
+transport drives a GameClient that is already connected to the broker in credentials.env.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+from typing import Optional
+
+import GameClient
+from serializer import decode
+from transport import LoopbackBroker, connectBroker
+
+MOVES = ('UP', 'DOWN', 'LEFT', 'RIGHT')
+
+
+def rssKB() -> int:
+    """
+    :return: Current resident set size, peak RSS where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    :param values: Sorted values
+    :param p: 0-100, nearest rank
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+class LoadGenerator:
+    def __init__(self, client, numLobbies: int, numPlayers: int, seed: Optional[int] = None):
+        """
+        :param client: Paho or loopback client the bots publish and subscribe with
+        """
+        self.client = client
+        self.numLobbies = numLobbies
+        self.numPlayers = numPlayers
+        self.rng = random.Random(seed)
+        self.lobbyIds = itertools.count()
+        self.prefix = f'Load{os.getpid()}-'
+        self.sent: dict[tuple[str, str], float] = {}
+        self.latencies: list[float] = []
+        self.rounds = 0
+        self.games = 0
+        self.received = 0
+        self.published = 0
+        # RSS once every lobby has played a round, before latency samples pile up
+        self.rss: Optional[int] = None
+
+        client.on_message = self.on_message
+        client.subscribe('games/+/+/game_state')
+        client.subscribe('games/+/game_state')
+        client.subscribe('games/+/scores')
+        client.subscribe('games/+/lobby')
+
+    def startLobby(self):
+        lobby_name = f'{self.prefix}{next(self.lobbyIds)}'
+        for i in range(self.numPlayers):
+            self.publish('new_game', json.dumps({'lobby_name': lobby_name,
+                                                 'team_name': f'Team{i % 2}',
+                                                 'player_name': f'Bot{i}'}))
+        self.publish(f'games/{lobby_name}/start', 'START')
+
+    def start(self):
+        for _ in range(self.numLobbies):
+            self.startLobby()
+
+    def publish(self, topic: str, payload: str):
+        self.published += 1
+        self.client.publish(topic, payload)
+
+    def on_message(self, client, userdata, msg):
+        now = time.perf_counter()
+        self.received += 1
+        topic_list = msg.topic.split('/')
+        if not topic_list[1].startswith(self.prefix):
+            return
+        lobby_name, route = topic_list[1], topic_list[-1]
+        if route == 'game_state':
+            players = decode(msg.payload).keys() if len(topic_list) == 3 else (topic_list[2],)
+            for player_name in players:
+                sent = self.sent.pop((lobby_name, player_name), None)
+                if sent is not None:
+                    self.latencies.append(now - sent)
+                self.sent[lobby_name, player_name] = time.perf_counter()
+                self.publish(f'games/{lobby_name}/{player_name}/move', self.rng.choice(MOVES))
+        elif route == 'scores':
+            self.rounds += 1
+            if self.rss is None and self.rounds >= self.numLobbies:
+                self.rss = rssKB()
+        elif route == 'lobby' and msg.payload.startswith(b'Game Over'):
+            for i in range(self.numPlayers):
+                self.sent.pop((lobby_name, f'Bot{i}'), None)
+            self.games += 1
+            self.startLobby()
+
+    def results(self, elapsed: float) -> dict:
+        latencies = sorted(self.latencies)
+        messages = self.received + self.published
+        return {'rounds': self.rounds,
+                'roundsPerSecond': self.rounds / elapsed,
+                'games': self.games,
+                'messages': messages,
+                'messagesPerSecond': messages / elapsed,
+                'latencyMs': {'p50': percentile(latencies, 50) * 1000,
+                              'p90': percentile(latencies, 90) * 1000,
+                              'p99': percentile(latencies, 99) * 1000,
+                              'max': (latencies[-1] if latencies else 0.0) * 1000},
+                'elapsed': elapsed}
+
+
+def runLoopback(numLobbies: int, numPlayers: int, seconds: float, seed: Optional[int] = None) -> dict:
+    broker = LoopbackBroker()
+    server = broker.client('GameClient')
+    GameClient.init_client(server, verbose=False)
+    generator = LoadGenerator(broker.client('LoadGen'), numLobbies, numPlayers, seed)
+
+    baseline = rssKB()
+    generator.start()
+    start = time.perf_counter()
+    try:
+        broker.run(until=lambda: time.perf_counter() - start >= seconds)
+    finally:
+        GameClient.close_client(server)
+    results = generator.results(time.perf_counter() - start)
+    results['rssPerLobbyKB'] = ((rssKB() if generator.rss is None else generator.rss) - baseline) / numLobbies
+    return results
+
+
+def runBroker(numLobbies: int, numPlayers: int, seconds: float, seed: Optional[int] = None) -> dict:
+    client = connectBroker(f'LoadGen{os.getpid()}')
+    generator = LoadGenerator(client, numLobbies, numPlayers, seed)
+    client.loop_start()
+    try:
+        generator.start()
+        start = time.perf_counter()
+        time.sleep(seconds)
+        results = generator.results(time.perf_counter() - start)
+    finally:
+        client.loop_stop()
+        client.disconnect()
+    # The server runs in another process
+    results['rssPerLobbyKB'] = None
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transport', choices=('loopback', 'broker'), default='loopback')
+    parser.add_argument('--lobbies', type=int, default=100)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', default=None, metavar='PATH', help='write the results as JSON, - for stdout')
+    args = parser.parse_args()
+
+    run = runLoopback if args.transport == 'loopback' else runBroker
+    results = run(args.lobbies, args.players, args.seconds, args.seed)
+    results['config'] = {'transport': args.transport, 'lobbies': args.lobbies, 'players': args.players,
+                         'seconds': args.seconds, 'seed': args.seed,
+                         'batchState': os.environ.get('BATCH_GAME_STATE') == '1',
+                         'serializer': os.environ.get('GAME_SERIALIZER') or 'json',
+                         'deltaState': os.environ.get('DELTA_GAME_STATE') == '1'}
+
+    if args.json == '-':
+        print(json.dumps(results, indent=2))
+    else:
+        if args.json is not None:
+            with open(args.json, 'w') as out:
+                json.dump(results, out, indent=2)
+        latency = results['latencyMs']
+        print(f"{results['rounds']} rounds, {results['roundsPerSecond']:.0f} rounds/s, "
+              f"{results['messagesPerSecond']:.0f} messages/s, {results['games']} games finished")
+        print(f"move-to-state latency p50 {latency['p50']:.2f}ms p90 {latency['p90']:.2f}ms "
+              f"p99 {latency['p99']:.2f}ms max {latency['max']:.2f}ms")
+        if results['rssPerLobbyKB'] is not None:
+            print(f"{results['rssPerLobbyKB']:.1f} KB RSS per lobby")
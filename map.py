@@ -2,11 +2,17 @@
 Author: Charles Lee
 """
 
-from copy import deepcopy
 from player import Player
+from team import Team
+from validation import DEBUG
 import random
 from gameItems import *
-from typing import Optional
+from typing import Callable, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def getDefaultWallChoices():
     wall = []
@@ -20,36 +26,225 @@ def getDefaultWallChoices():
     return wall
 
 
+# Shared by every map using the default layout instead of a list per map
+DEFAULT_WALL_CHOICES = tuple(getDefaultWallChoices())
+
+
+# Shared item for every non-player cell kind, used to rebuild cells from array-backed maps
+KIND_TO_ITEM = {
+    CellKind.WALL: Wall(),
+    CellKind.COIN1: Coin1(),
+    CellKind.COIN2: Coin2(),
+    CellKind.COIN3: Coin3(),
+}
+
+COIN_KINDS = {CellKind.COIN1: 1, CellKind.COIN2: 2, CellKind.COIN3: 3}
+
+# Bound once, reading members off the Enum class is slow on hot paths
+EMPTY, WALL, PLAYER = CellKind.EMPTY, CellKind.WALL, CellKind.PLAYER
+
+
+def makeRng(seed: Union[int, random.Random, None] = None):
+    """
+    :return: seed itself if it is a random.Random, a new random.Random for an integer seed,
+             or the global random module for None
+    """
+    if seed is None:
+        return random
+    if isinstance(seed, random.Random):
+        return seed
+    assert isinstance(seed, int)
+    return random.Random(seed)
+
+
+def formatGrid(height: int, width: int, read: Callable[[tuple[int, int]], object]) -> str:
+    result = []
+    for x in range(height):
+        row_str = []
+        for y in range(width):
+            cell = read((x, y))
+            if cell is None:
+                cellName = 'None'
+            elif isinstance(cell, Player):
+                cellName = cell.name
+            else:
+                cellName = cell.__class__.__name__
+            row_str.append(cellName)
+        result.append('\t'.join(row_str))
+
+    output = '\n'.join(result)
+
+    return output
+
+
+def freezePlayers(players: list[Player]) -> dict[Player, Player]:
+    """
+    :return: {player: copy}, the copies keep the loc and team score the players have now. Teammates share
+             one team copy.
+    """
+    teams = {}
+    copies = {}
+    for player in players:
+        team = player.team
+        if team is not None and team not in teams:
+            teams[team] = Team(team.name)
+            teams[team].increaseScore(team.score)
+        copy = Player(player.name, teams.get(team))
+        if player.loc is not None:
+            copy.loc = player.loc
+        copies[player] = copy
+    return copies
+
+
+class MapView:
+    """
+    Read-only grid view that reads cells straight out of a map's storage without copying.
+    Cells can be read as view[x, y] or view[x][y], and iterating yields rows.
+    """
+    __slots__ = ('__height', '__width', '__read')
+
+    def __init__(self, height: int, width: int, read: Callable[[tuple[int, int]], object]):
+        self.__height = height
+        self.__width = width
+        self.__read = read
+
+    @property
+    def height(self):
+        return self.__height
+
+    @property
+    def width(self):
+        return self.__width
+
+    def __len__(self):
+        return self.__height
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.__read(key)
+        if not -self.__height <= key < self.__height:
+            raise IndexError('map row index out of range')
+        x = key % self.__height
+        return tuple(self.__read((x, y)) for y in range(self.__width))
+
+    def __iter__(self):
+        for x in range(self.__height):
+            yield self[x]
+
+    def tolist(self) -> list[list[object]]:
+        """
+        :return: New nested lists holding the same cell objects
+        """
+        return [list(row) for row in self]
+
+    def __repr__(self):
+        return formatGrid(self.__height, self.__width, self.__read)
+
+
 class Map:
     COIN_MIN_RATIO = 0.1
     COIN_MAX_RATIO = 0.2
     WALL_MIN_RATIO = 0.1
     WALL_MAX_RATIO = 0.3
 
-    def __init__(self, height: int, width: int, playersList: list[Player], wallChoices: list[tuple[int]] = None):
+    def __init__(self, height: int, width: int, playersList: list[Player], wallChoices: list[tuple[int]] = None,
+                 arrayBacked: bool = False, seed: Union[int, random.Random, None] = None):
+        """
+        :param arrayBacked: Store the board as an int8 cell-kind array plus a player-id array instead of
+                            one Python object per cell. Requires numpy.
+        :param seed: Integer seed or random.Random instance used to generate the board. Defaults to the
+                     global random module.
+        """
         assert isinstance(width, int) and isinstance(height, int)
         assert isinstance(playersList, list)
         self.__height = height
         self.__width = width
-        self.__map: list[list[object]] = [[None for _ in range(width)] for _ in range(height)]
+        self.__arrayBacked = arrayBacked
+
+        if arrayBacked:
+            if np is None:
+                raise ImportError('numpy is required for array-backed maps')
+            self.__kinds = np.zeros((height, width), dtype=np.int8)
+            self.__playerIds = np.full((height, width), -1, dtype=np.int32)
+            self.__players: list[Player] = []
+            self.__playerIndex: dict[str, int] = {}
+            for player in playersList:
+                self.__playerId(player)
+        else:
+            self.__map: list[list[object]] = [[None for _ in range(width)] for _ in range(height)]
 
         self.__numCoins = 0
+        self.__coinCounts = {value: 0 for value in COIN_KINDS.values()}
+        self.__coinValue = 0
+        self.__shared = False
 
-        self.wallChoices = getDefaultWallChoices() if wallChoices is None else wallChoices
+        self.wallChoices = DEFAULT_WALL_CHOICES if wallChoices is None else wallChoices
 
+        self.seed = seed if isinstance(seed, int) else None
+        self.__rng = makeRng(seed)
+        self.__generatedPlayers = list(playersList)
         self.__fillMap(playersList)
 
 
     @property
     def numCoins(self):
         return self.__numCoins
-    
-    def decreaseCoin(self):
+
+    @property
+    def coinValue(self):
+        """
+        :return: Total value of the coins left on the board
+        """
+        if self.__coinCounts is None:
+            self.__countCoins()
+        return self.__coinValue
+
+    def decreaseCoin(self, value: Optional[int] = None):
+        """
+        Records that a coin of the given value left the board. Callers that do not pass the value still keep
+        numCoins exact, the per-value counters are then recounted from the board the next time they are read.
+        """
         self.__numCoins -= 1
+        if value is None:
+            self.__coinCounts = None
+        elif self.__coinCounts is not None:
+            self.__coinCounts[value] -= 1
+            self.__coinValue -= value
 
     @property
-    def map(self):
-        return deepcopy(self.__map)
+    def map(self) -> MapView:
+        """
+        :return: Live read-only view of the board, no cells are copied. Use snapshot() for a view that
+                 does not change as the game goes on.
+        """
+        return MapView(self.__height, self.__width, self.__read)
+
+    def snapshot(self) -> MapView:
+        """
+        Copy-on-write snapshot of the board. No cells are copied when taking one; the map copies its storage
+        on the next set() so the snapshot keeps the cells it was taken with. Players on the map are read back
+        as copies frozen with the loc and team score they had when the snapshot was taken.
+        """
+        self.__shared = True
+        if self.__arrayBacked:
+            copies = freezePlayers(self.__players)
+            kinds, playerIds, players = self.__kinds, self.__playerIds, [copies[player] for player in self.__players]
+
+            def read(loc):
+                kind = kinds.item(loc)
+                if kind == CellKind.EMPTY:
+                    return None
+                if kind == CellKind.PLAYER:
+                    return players[playerIds.item(loc)]
+                return KIND_TO_ITEM[kind]
+        else:
+            grid, copies = self.__map, freezePlayers(self.__generatedPlayers)
+
+            def read(loc):
+                cell = grid[loc[0]][loc[1]]
+                return copies.get(cell, cell)
+
+        return MapView(self.__height, self.__width, read)
 
     @property
     def height(self):
@@ -59,73 +254,219 @@ class Map:
     def width(self):
         return self.__width
 
+    @property
+    def arrayBacked(self):
+        return self.__arrayBacked
+
+    @property
+    def kinds(self):
+        """
+        :return: (height, width) int8 array of CellKind codes. Array-backed maps return a read-only view of
+                 their storage, list-backed maps build a new array.
+        """
+        if np is None:
+            raise ImportError('numpy is required for array queries')
+        if self.__arrayBacked:
+            view = self.__kinds.view()
+            view.flags.writeable = False
+            return view
+        kinds = np.zeros((self.__height, self.__width), dtype=np.int8)
+        for x, row in enumerate(self.__map):
+            for y, cell in enumerate(row):
+                kinds[x, y] = Map.__kindOf(cell)
+        return kinds
+
+    def wallMask(self):
+        """
+        :return: (height, width) boolean array that is True on walls
+        """
+        return self.kinds == CellKind.WALL
+
+    def coinCounts(self) -> dict[int, int]:
+        """
+        :return: Number of coins on the board for each coin value, {1: n, 2: n, 3: n}. Kept up to date by
+                 decreaseCoin, no scan unless a coin was taken without its value.
+        """
+        if self.__coinCounts is None:
+            self.__countCoins()
+        return dict(self.__coinCounts)
+
     def __repr__(self):
-        result = []
-        for row in self.__map:
-            row_str = []
-            for cell in row:
-                if cell is None:
-                    cellName = 'None'
-                elif isinstance(cell, Player):
-                    cellName = cell.name
-                else:
-                    cellName = cell.__class__.__name__
-                row_str.append(cellName)
-            result.append('\t'.join(row_str))
-
-        output = '\n'.join(result)
-
-        return output
+        return formatGrid(self.__height, self.__width, self.__read)
 
     def set(self, loc: tuple[int, int], item: object):
-        assert isinstance(loc, tuple) and len(loc) == 2 and isinstance(loc[0], int) and isinstance(loc[1], int)
+        if DEBUG:
+            assert isinstance(loc, tuple) and len(loc) == 2 and isinstance(loc[0], int) and isinstance(loc[1], int)
+        if self.__shared:
+            self.__detach()
+        if self.__arrayBacked:
+            self.__kinds[loc] = Map.__kindOf(item)
+            self.__playerIds[loc] = self.__playerId(item) if isinstance(item, Player) else -1
+            return
         self.__map[loc[0]][loc[1]] = item
 
     def get(self, loc: tuple[int, int]):
-        assert isinstance(loc, tuple) and len(loc) == 2 and isinstance(loc[0], int) and isinstance(loc[1], int)
+        if DEBUG:
+            assert isinstance(loc, tuple) and len(loc) == 2 and isinstance(loc[0], int) and isinstance(loc[1], int)
+        return self.__read(loc)
+
+    def replacePlayers(self, players: list[Player]):
+        """
+        Puts players on the cells of the players the map was generated with, in order, so a pre-generated
+        map can be handed to a new lobby (see MapPool).
+        """
+        assert isinstance(players, list) and len(players) == len(self.__generatedPlayers)
+        if self.__arrayBacked:
+            self.__players, self.__playerIndex = [], {}
+        for old, new in zip(self.__generatedPlayers, players):
+            self.set(old.loc, new)
+            new.loc = old.loc
+        self.__generatedPlayers = list(players)
+
+    def step(self, fromLoc: tuple[int, int], toLoc: tuple[int, int]) -> int:
+        """
+        Unchecked single-call move for hot paths: moves whatever is on fromLoc onto toLoc, leaving fromLoc empty,
+        unless toLoc holds a wall or a player. Both locs must be inside the map.
+        :return: The CellKind that was on toLoc, nothing moved if it is WALL or PLAYER
+        """
+        if self.__arrayBacked:
+            kind = self.__kinds.item(toLoc)
+            if kind == WALL or kind == PLAYER:
+                return kind
+            if self.__shared:
+                self.__detach()
+            kinds, playerIds = self.__kinds, self.__playerIds
+            kinds[toLoc] = kinds[fromLoc]
+            playerIds[toLoc] = playerIds[fromLoc]
+            kinds[fromLoc] = EMPTY
+            playerIds[fromLoc] = -1
+            return kind
+
+        cell = self.__map[toLoc[0]][toLoc[1]]
+        if cell is None:
+            kind = EMPTY
+        else:
+            kind = cell.kind
+            if kind == WALL or kind == PLAYER:
+                return kind
+        if self.__shared:
+            self.__detach()
+        grid = self.__map
+        grid[toLoc[0]][toLoc[1]] = grid[fromLoc[0]][fromLoc[1]]
+        grid[fromLoc[0]][fromLoc[1]] = None
+        return kind
+
+    def __read(self, loc: tuple[int, int]):
+        if self.__arrayBacked:
+            kind = self.__kinds.item(loc)
+            if kind == CellKind.EMPTY:
+                return None
+            if kind == CellKind.PLAYER:
+                return self.__players[self.__playerIds.item(loc)]
+            return KIND_TO_ITEM[kind]
         return self.__map[loc[0]][loc[1]]
 
+    def __countCoins(self):
+        self.__coinCounts = {value: 0 for value in COIN_KINDS.values()}
+        for x in range(self.__height):
+            for y in range(self.__width):
+                value = COIN_KINDS.get(Map.__kindOf(self.__read((x, y))))
+                if value is not None:
+                    self.__coinCounts[value] += 1
+        self.__coinValue = sum(value * count for value, count in self.__coinCounts.items())
+
+    def __detach(self):
+        # Give outstanding snapshots the current storage and keep writing to a private copy
+        if self.__arrayBacked:
+            self.__kinds = self.__kinds.copy()
+            self.__playerIds = self.__playerIds.copy()
+            self.__players = list(self.__players)
+        else:
+            self.__map = [row[:] for row in self.__map]
+        self.__shared = False
+
+    @staticmethod
+    def __kindOf(item: object) -> CellKind:
+        return CellKind.EMPTY if item is None else item.kind
+
+    def __playerId(self, player: Player) -> int:
+        try:
+            return self.__playerIndex[player.name]
+        except KeyError:
+            self.__playerIndex[player.name] = len(self.__players)
+            self.__players.append(player)
+            return self.__playerIndex[player.name]
+
     def __fillMap(self, players: list[Player]):
         assert isinstance(players, list)
 
-        empty = self.__width*self.__height
+        height, width = self.__height, self.__width
+        rng = self.__rng
+        empty = width*height
+
+        # Deduplicated wall cells that fit on this board, in their original order
+        wallChoices = None if self.wallChoices is None else \
+            list(dict.fromkeys((x, y) for x, y in self.wallChoices if 0 <= x < height and 0 <= y < width))
 
         maxWalls = int(Map.WALL_MAX_RATIO * empty)
-        maxWalls = maxWalls if self.wallChoices is None else len(self.wallChoices)
+        maxWalls = maxWalls if wallChoices is None else len(wallChoices)
 
         minWalls = int(Map.WALL_MIN_RATIO * empty)
         minWalls = 0 if maxWalls < minWalls else minWalls
 
-        numWalls = random.randint(minWalls, maxWalls)
-        wallChoices = deepcopy(self.wallChoices)
-        for _ in range(numWalls):
-            self.__placeRandom(Wall(), wallChoices)
-
-        # Fill players
-        for player in players:
-            player.loc = self.__placeRandom(player)
+        numWalls = rng.randint(minWalls, maxWalls)
+        if wallChoices is None:
+            walls = {divmod(index, width) for index in rng.sample(range(empty), numWalls)}
+        else:
+            walls = set(rng.sample(wallChoices, numWalls))
 
         numPlayers = len(players)
         empty = empty - numWalls - numPlayers
+        self.__numCoins = rng.randint(int(Map.COIN_MIN_RATIO * empty), int(Map.COIN_MAX_RATIO * empty))
 
-        self.__numCoins = random.randint(int(Map.COIN_MIN_RATIO * empty), int(Map.COIN_MAX_RATIO * empty))
-        for _ in range(self.__numCoins):
-            coin = random.choices((Coin1, Coin2, Coin3), (6,3,1))[0]()
-            self.__placeRandom(coin)
+        # Sample players and coins together without replacement. Drawing numWalls extra cells guarantees
+        # enough of them are left once the ones that landed on walls are dropped.
+        needed = numPlayers + self.__numCoins
+        free = []
+        for index in rng.sample(range(width*height), min(needed + numWalls, width*height)):
+            loc = divmod(index, width)
+            if loc not in walls:
+                free.append(loc)
+                if len(free) == needed:
+                    break
 
-    def __placeRandom(self, obj, choice: Optional[list] = None):
-        while True:
-            if choice is None:
-                x, y = random.randint(0, self.__height - 1), random.randint(0, self.__width - 1)
-            else:
-                x, y = random.choice(choice)
-                choice.remove((x,y))
-            if self.__map[x][y] is None:
-                self.__map[x][y] = obj
-                return x, y
+        coins = rng.choices((Coin1, Coin2, Coin3), (6,3,1), k=self.__numCoins)
+        for coin in coins:
+            self.__coinCounts[COIN_KINDS[coin.kind]] += 1
+        self.__coinValue = sum(value * count for value, count in self.__coinCounts.items())
+        playerLocs, coinLocs = free[:numPlayers], free[numPlayers:]
+
+        if self.__arrayBacked:
+            self.__fillArrays(walls, players, playerLocs, coins, coinLocs)
+        else:
+            grid = self.__map
+            wall = KIND_TO_ITEM[CellKind.WALL]
+            for x, y in walls:
+                grid[x][y] = wall
+            for player, (x, y) in zip(players, playerLocs):
+                grid[x][y] = player
+            for coin, (x, y) in zip(coins, coinLocs):
+                grid[x][y] = KIND_TO_ITEM[coin.kind]
+
+        for player, loc in zip(players, playerLocs):
+            player.loc = loc
 
+    def __fillArrays(self, walls: set, players: list[Player], playerLocs: list, coins: list, coinLocs: list):
+        kinds, playerIds = self.__kinds, self.__playerIds
+        if walls:
+            kinds[tuple(np.array(list(walls)).T)] = CellKind.WALL
+        for player, loc in zip(players, playerLocs):
+            kinds[loc] = CellKind.PLAYER
+            playerIds[loc] = self.__playerId(player)
+        if coinLocs:
+            kinds[tuple(np.array(coinLocs).T)] = [coin.kind for coin in coins]
 
 if __name__ == '__main__':
     m = Map(10, 10, [Player('Charles', None), Player('James', None)])
     print(m)
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,85 @@
+"""
+Pre-generates maps in a background thread so starting a game does not have to wait for Map generation.
+"""
+
+import queue
+import random
+import threading
+from typing import Optional, Union
+
+from map import Map
+from player import Player
+
+
+class MapPool:
+    def __init__(self, sizes: list[tuple[int, int, int]], depth: int = 4, arrayBacked: bool = False,
+                 seed: Union[int, random.Random, None] = None, start: bool = True):
+        """
+        :param sizes: (height, width, numPlayers) combinations to keep ready maps for
+        :param depth: Ready maps to keep per combination
+        :param seed: Integer seed or random.Random the per-map seeds are drawn from. Each map keeps its
+                     own seed in Map.seed, so a game can be replayed with Game(seed=map.seed).
+        :param start: Start the background thread right away
+        """
+        assert isinstance(depth, int) and depth > 0
+        self.__depth = depth
+        self.__arrayBacked = arrayBacked
+        self.__seeds = seed if isinstance(seed, random.Random) else random.Random(seed)
+        self.__seedLock = threading.Lock()
+        self.__ready: dict[tuple[int, int, int], queue.Queue] = {size: queue.Queue(maxsize=depth) for size in sizes}
+        self.__wakeup = threading.Event()
+        self.__stopped = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+        if start:
+            self.start()
+
+    def start(self):
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, name='MapPool', daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.__wakeup.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def get(self, height: int, width: int, numPlayers: int) -> Map:
+        """
+        :return: A ready map when one is pooled for this size, otherwise one generated right away.
+                 Pass it to Game(premadeMap=...) to place the real players.
+        """
+        ready = self.__ready.get((height, width, numPlayers))
+        if ready is not None:
+            try:
+                premade = ready.get_nowait()
+                self.__wakeup.set()
+                return premade
+            except queue.Empty:
+                pass
+        return self.__generate(height, width, numPlayers)
+
+    def available(self, height: int, width: int, numPlayers: int) -> int:
+        ready = self.__ready.get((height, width, numPlayers))
+        return 0 if ready is None else ready.qsize()
+
+    def __generate(self, height: int, width: int, numPlayers: int) -> Map:
+        with self.__seedLock:
+            seed = self.__seeds.randrange(2**32)
+        slots = [Player(f'__slot{i}', None) for i in range(numPlayers)]
+        return Map(height, width, slots, arrayBacked=self.__arrayBacked, seed=seed)
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            self.__wakeup.clear()
+            filled = False
+            # Round-robin one map per size so a single size cannot starve the others
+            for (height, width, numPlayers), ready in self.__ready.items():
+                if self.__stopped.is_set():
+                    return
+                if not ready.full():
+                    ready.put(self.__generate(height, width, numPlayers))
+                    filled = True
+            if not filled:
+                self.__wakeup.wait()
@@ -1,7 +1,10 @@
 import os
 import json
 from dotenv import load_dotenv
-import copy
+
+from serializer import decode
+from deltaStream import decodeState
+from greedy import determine_next_move
 import paho.mqtt.client as paho
 from paho import mqtt
 import time
@@ -11,6 +14,9 @@ import random
 # Dictionary to store player positions
 player_positions = {}
 
+# Rebuilds full game states when the server sends deltas
+delta_decoders = {}
+
 # setting callbacks for different events to see if it works, print the message etc.
 def on_connect(client, userdata, flags, rc, properties=None):
     """
@@ -60,93 +66,36 @@ def on_message(client, userdata, msg):
     """
     topic = msg.topic
     
-    payload = msg.payload.decode()
+    payload = msg.payload
     
 
     if topic.endswith("/game_state"):
-        player_name = topic.split("/")[-2]
-        print(player_name)
-        game_state = json.loads(payload)
-        print(game_state)
-        print("^^game state")
-        player_positions[player_name] = game_state["currentPosition"]
+        topic_list = topic.split("/")
+        # Batched servers publish every player's state in one message on games/{lobby}/game_state
+        if len(topic_list) == 3:
+            game_states = decode(payload)
+        else:
+            game_states = {topic_list[-2]: decode(payload)}
 
-        # Determine the next move for the player
-        next_move = determine_next_move(player_name, game_state)
+        for player_name, game_state in game_states.items():
+            game_state = decodeState(delta_decoders, player_name, game_state)
+            if game_state is None:
+                # Missed a delta, ask for a keyframe
+                client.publish(f"games/{lobby_name}/{player_name}/resync", "")
+                continue
+            print(player_name)
+            print(game_state)
+            print("^^game state")
+            player_positions[player_name] = game_state["currentPosition"]
 
-        # Publish the move for the player
-        client.publish(f"games/{lobby_name}/{player_name}/move", next_move)
+            # Determine the next move for the player
+            next_move = determine_next_move(player_name, game_state)
 
-    print("message: " + msg.topic + " " + str(msg.qos) + " " + str(msg.payload))
+            # Publish the move for the player
+            client.publish(f"games/{lobby_name}/{player_name}/move", next_move)
 
+    print("message: " + msg.topic + " " + str(msg.qos) + " " + str(msg.payload))
 
-def euclidean_distance(point1, point2):
-    x_diff = point1[0] - point2[0]
-    y_diff = point1[1] - point2[1]
-    return (x_diff ** 2 + y_diff ** 2) ** 0.5
-
-# Function to determine the next move based on the game state
-def determine_next_move(player_name, game_state):
-    # simple strategy that moves the player towards the closest coin using our pos dict
-    player_pos = game_state["currentPosition"]
-    all_coin_positions = game_state["coin1"] + game_state["coin2"] + game_state["coin3"]
-    # Get the list of wall positions
-    walls = game_state["walls"]
-
-    # Create a list of distances between the player's position and each coin's position
-    distances = []
-    for coin_pos in all_coin_positions:
-        distance = euclidean_distance(coin_pos, player_pos)
-        distances.append(distance)
-
-
-    next_position = copy.copy(player_pos)
-    #check that there is a coin within FOV
-    if not distances:
-        # Try to move in the following order: right, down, left, up
-        for direction in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            temp_position = copy.copy(player_pos)
-            temp_position[0] += direction[0]
-            temp_position[1] += direction[1]
-            if temp_position not in walls:
-                next_position = temp_position
-                break
-    else:
-        # Find the minimum distance and get the corresponding coin's position
-        min_distance = min(distances)
-        min_distance_index = distances.index(min_distance)
-        closest_coin = all_coin_positions[min_distance_index]
-
-        
-        if closest_coin[0] > player_pos[0]:
-            next_position[0] += 1
-        elif closest_coin[0] < player_pos[0]:
-            next_position[0] -= 1
-        elif closest_coin[1] > player_pos[1]:
-            next_position[1] += 1
-        else:
-            next_position[1] -= 1
-        
-        # Check if the next position is a wall
-        if next_position in walls:
-            # If the next position is a wall, try other directions
-            for direction in [[-1, 0], [1, 0], [0, -1], [0, 1]]:
-                temp_position = copy.copy(player_pos)
-                temp_position[0] += direction[0]
-                temp_position[1] += direction[1]
-                if temp_position not in walls:
-                    next_position = temp_position
-                    break
-
-
-    if next_position[0] > player_pos[0]:
-        return "DOWN"
-    elif next_position[0] < player_pos[0]:
-        return "UP"
-    elif next_position[1] > player_pos[1]:
-        return "RIGHT"
-    else:
-        return "LEFT"
 
 if __name__ == '__main__':
     load_dotenv(dotenv_path='./credentials.env')
@@ -177,6 +126,7 @@ if __name__ == '__main__':
 
     client.subscribe(f"games/{lobby_name}/lobby")
     client.subscribe(f'games/{lobby_name}/+/game_state')
+    client.subscribe(f'games/{lobby_name}/game_state')
     client.subscribe(f'games/{lobby_name}/scores')
 
     client.publish("new_game", json.dumps({'lobby_name':lobby_name,
@@ -0,0 +1,157 @@
+"""
+Grid pathfinding for bots, in Moveset steps. Boards are height x width with (x, y) = (row, column) like Game,
+blocked is any container of cells that cannot be entered (walls, other players).
+
+    bfs            shortest path to the nearest of several goals
+    astar          shortest path to one goal, Manhattan heuristic
+    distanceField  steps from the nearest source to every cell, one BFS for any number of sources
+    descend        first move down a distance field, i.e. towards the nearest source
+
+Visited cells are tracked in flat bytearrays indexed x*width+y, so membership tests are O(1) whatever the
+board size.
+"""
+
+import heapq
+from collections import deque
+from typing import Collection, Iterable, Optional
+
+from moveset import Moveset
+
+MOVES = tuple((move, move.value) for move in Moveset)
+
+
+def neighbours(loc: tuple[int, int], height: int, width: int, blocked: Collection = ()):
+    """
+    :return: (move, (x,y)) for every in-bounds, unblocked cell one move away
+    """
+    x, y = loc
+    for move, (dx, dy) in MOVES:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < height and 0 <= ny < width and (nx, ny) not in blocked:
+            yield move, (nx, ny)
+
+
+def bfs(start: tuple[int, int], goals: Collection, height: int, width: int,
+        blocked: Collection = ()) -> Optional[list[Moveset]]:
+    """
+    :param goals: Cells to reach, the nearest one wins. Goals are reachable even if they are also blocked.
+    :return: Moves from start to the nearest goal, [] if start is a goal, None if no goal can be reached
+    """
+    if start in goals:
+        return []
+    seen = bytearray(height * width)
+    seen[start[0] * width + start[1]] = 1
+    parents = {start: None}
+    frontier = deque((start,))
+    while frontier:
+        loc = frontier.popleft()
+        x, y = loc
+        for move, (dx, dy) in MOVES:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < height and 0 <= ny < width) or seen[nx * width + ny]:
+                continue
+            seen[nx * width + ny] = 1
+            nextLoc = (nx, ny)
+            parents[nextLoc] = (loc, move)
+            if nextLoc in goals:
+                return _unwind(parents, nextLoc)
+            if nextLoc not in blocked:
+                frontier.append(nextLoc)
+    return None
+
+
+def astar(start: tuple[int, int], goal: tuple[int, int], height: int, width: int,
+          blocked: Collection = ()) -> Optional[list[Moveset]]:
+    """
+    :return: Moves of a shortest path from start to goal, None if goal cannot be reached
+    """
+    if start == goal:
+        return []
+    gx, gy = goal
+    closed = bytearray(height * width)
+    costs = {start: 0}
+    parents = {start: None}
+    # (estimate, cost, tiebreak, loc), the counter keeps pops deterministic without comparing parents
+    heap = [(abs(start[0] - gx) + abs(start[1] - gy), 0, 0, start)]
+    pushes = 1
+    while heap:
+        _, cost, _, loc = heapq.heappop(heap)
+        if loc == goal:
+            return _unwind(parents, loc)
+        x, y = loc
+        if closed[x * width + y]:
+            continue
+        closed[x * width + y] = 1
+        for move, (dx, dy) in MOVES:
+            nx, ny = x + dx, y + dy
+            nextLoc = (nx, ny)
+            if not (0 <= nx < height and 0 <= ny < width) or closed[nx * width + ny]:
+                continue
+            if nextLoc in blocked and nextLoc != goal:
+                continue
+            if cost + 1 < costs.get(nextLoc, height * width):
+                costs[nextLoc] = cost + 1
+                parents[nextLoc] = (loc, move)
+                heapq.heappush(heap, (cost + 1 + abs(nx - gx) + abs(ny - gy), cost + 1, pushes, nextLoc))
+                pushes += 1
+    return None
+
+
+def distanceField(sources: Iterable[tuple[int, int]], height: int, width: int,
+                  blocked: Collection = ()) -> list[list[Optional[int]]]:
+    """
+    Multi-source BFS. Sources themselves are at distance 0 even if blocked.
+    :return: [x][y] steps from the nearest source, None where no source can be reached
+    """
+    field: list[list[Optional[int]]] = [[None] * width for _ in range(height)]
+    frontier = deque()
+    for x, y in sources:
+        if 0 <= x < height and 0 <= y < width and field[x][y] is None:
+            field[x][y] = 0
+            frontier.append((x, y))
+    while frontier:
+        x, y = frontier.popleft()
+        distance = field[x][y] + 1
+        for _, (dx, dy) in MOVES:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < height and 0 <= ny < width and field[nx][ny] is None and (nx, ny) not in blocked:
+                field[nx][ny] = distance
+                frontier.append((nx, ny))
+    return field
+
+
+def descend(field: list[list[Optional[int]]], loc: tuple[int, int], blocked: Collection = ()) -> Optional[Moveset]:
+    """
+    :return: Move to the neighbour closest to a source of field, None if loc is a source or none can be reached.
+             Sources can be stepped onto even if blocked, like the goals of bfs.
+    """
+    height, width = len(field), len(field[0])
+    best = None
+    for move, (nx, ny) in neighbours(loc, height, width):
+        distance = field[nx][ny]
+        if distance is None or (distance != 0 and (nx, ny) in blocked):
+            continue
+        if best is None or distance < best[0]:
+            best = (distance, move)
+    current = field[loc[0]][loc[1]]
+    if best is None or (current is not None and best[0] >= current):
+        return None
+    return best[1]
+
+
+def _unwind(parents: dict, loc: tuple[int, int]) -> list[Moveset]:
+    moves = []
+    while parents[loc] is not None:
+        loc, move = parents[loc]
+        moves.append(move)
+    moves.reverse()
+    return moves
+
+
+if __name__ == '__main__':
+    walls = {(row, 4) for row in range(9)}
+    print(bfs((0, 0), {(0, 9), (9, 9)}, 10, 10, walls))
+    print(astar((0, 0), (0, 9), 10, 10, walls))
+    field = distanceField([(0, 9)], 10, 10, walls)
+    print('\n'.join(' '.join('##' if d is None else f'{d:2}' for d in row) for row in field))
+    print(descend(field, (0, 0), walls))
@@ -4,11 +4,16 @@ Author: Charles Lee
 
 from __future__ import annotations
 from typing import Optional, TYPE_CHECKING
+from gameItems import CellKind
+from validation import DEBUG
 if TYPE_CHECKING:
     from team import Team
 
 
 class Player:
+    __slots__ = ('__name', '__team', '__loc')
+    kind = CellKind.PLAYER
+
     def __init__(self, playerName: str, team: Team):
         assert isinstance(playerName, str)
 
@@ -30,5 +35,6 @@ class Player:
 
     @loc.setter
     def loc(self, value: tuple[int,int]):
-        assert isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], int) and isinstance(value[1], int)
+        if DEBUG:
+            assert isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], int) and isinstance(value[1], int)
         self.__loc = value
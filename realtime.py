@@ -0,0 +1,163 @@
+"""
+Fixed-rate real-time mode. Instead of waiting for every player, the game advances tickRate times per second and
+applies the latest move each player submitted since the previous tick. Every tick is timed against its budget
+of 1/tickRate seconds so slow ticks show up as overruns.
+
+    python realtime.py --rate 20 --seconds 5
+"""
+
+import argparse
+import math
+import random
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from game import Game
+from moveset import Moveset
+
+
+class TickStats:
+    """
+    Tick durations and overruns against a fixed per-tick budget
+    """
+
+    def __init__(self, budget: float, window: int = 10000):
+        """
+        :param budget: Seconds a tick may take
+        :param window: Number of recent ticks kept for the percentiles
+        """
+        self.budget = budget
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.worst = 0.0
+        self.__durations = deque(maxlen=window)
+
+    def record(self, duration: float):
+        self.ticks += 1
+        self.__durations.append(duration)
+        self.worst = max(self.worst, duration)
+        if duration > self.budget:
+            self.overruns += 1
+
+    def percentile(self, p: float) -> float:
+        """
+        :param p: 0-100, nearest rank over the recent window
+        """
+        if not self.__durations:
+            return 0.0
+        durations = sorted(self.__durations)
+        return durations[min(len(durations) - 1, max(0, math.ceil(p / 100 * len(durations)) - 1))]
+
+    def summary(self) -> dict:
+        """
+        :return: {ticks, overruns, skipped, budget, p50, p90, p99, max}, times in milliseconds
+        """
+        return {'ticks': self.ticks,
+                'overruns': self.overruns,
+                'skipped': self.skipped,
+                'budget': self.budget * 1000,
+                'p50': self.percentile(50) * 1000,
+                'p90': self.percentile(90) * 1000,
+                'p99': self.percentile(99) * 1000,
+                'max': self.worst * 1000}
+
+    def __str__(self):
+        s = self.summary()
+        return (f"{s['ticks']} ticks, p50 {s['p50']:.3f}ms p90 {s['p90']:.3f}ms p99 {s['p99']:.3f}ms "
+                f"max {s['max']:.3f}ms of {s['budget']:.1f}ms budget, {s['overruns']} overruns, {s['skipped']} skipped")
+
+
+class RealtimeGame:
+    """
+    Drives a Game at a fixed tick rate. Moves are buffered with submit() and applied together by tick().
+    """
+
+    def __init__(self, game: Game, tickRate: float, onTick: Optional[Callable[[dict], None]] = None,
+                 stats: Optional[TickStats] = None):
+        """
+        :param tickRate: Ticks per second
+        :param onTick: Called with the applyMoves diff after every tick, e.g. to broadcast state. Counts towards
+                       the tick time.
+        :param stats: Where to record tick times, lets a server share one TickStats across lobbies
+        """
+        assert tickRate > 0
+        self.game = game
+        self.tickRate = tickRate
+        self.interval = 1 / tickRate
+        self.onTick = onTick
+        self.stats = TickStats(self.interval) if stats is None else stats
+        self.__moves: dict[str, Moveset] = {}
+        self.__nextTick: Optional[float] = None
+
+    def submit(self, playerName: str, move: Moveset):
+        """
+        Buffers a move for the next tick, replacing any earlier move of the same player
+        """
+        if playerName not in self.game.all_players:
+            raise KeyError(f'{playerName} is not a valid player name')
+        self.__moves[playerName] = move
+
+    def tick(self) -> dict:
+        """
+        Applies the buffered moves, players that did not submit one stay where they are
+        :return: The applyMoves diff
+        """
+        start = time.perf_counter()
+        moves, self.__moves = self.__moves, {}
+        diff = self.game.applyMoves(moves.items())
+        if self.onTick is not None:
+            self.onTick(diff)
+        self.stats.record(time.perf_counter() - start)
+        return diff
+
+    def delay(self) -> float:
+        """
+        Seconds until the next tick is due and schedules the one after it. Ticks that could not start on time
+        are dropped rather than run back to back, so a slow tick does not cause a burst.
+        """
+        now = time.monotonic()
+        if self.__nextTick is None:
+            self.__nextTick = now
+        delay = self.__nextTick - now
+        if delay < 0:
+            missed = int(-delay / self.interval)
+            self.stats.skipped += missed
+            self.__nextTick += missed * self.interval
+            delay = 0.0
+        self.__nextTick += self.interval
+        return delay
+
+    def run(self, seconds: Optional[float] = None):
+        """
+        Ticks on the calling thread until the game is over or seconds have passed
+        """
+        end = None if seconds is None else time.monotonic() + seconds
+        while not self.game.gameOver() and (end is None or time.monotonic() < end):
+            time.sleep(self.delay())
+            self.tick()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=20, help='ticks per second')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--size', type=int, default=100, help='board height and width')
+    parser.add_argument('--players', type=int, default=8)
+    args = parser.parse_args()
+
+    names = [f'Player{i}' for i in range(args.players)]
+    game = Game({'TeamA': names[::2], 'TeamB': names[1::2]}, args.size, args.size, seed=1)
+    moves = list(Moveset)
+
+    def broadcast(diff: dict):
+        # Build every player's state like the server would, random bots answer before the next tick
+        for name in names:
+            game.getGameData(name)
+            realtime.submit(name, random.choice(moves))
+
+    realtime = RealtimeGame(game, args.rate, broadcast)
+    realtime.run(args.seconds)
+    print(realtime.stats)
+    print(game.getScores())
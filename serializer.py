@@ -0,0 +1,98 @@
+"""
+Pluggable encoders for game state payloads. Stdlib json is the default; orjson and msgpack are used when
+installed and selected, e.g. with GAME_SERIALIZER=orjson. decode() works out the format from the payload
+itself, so player clients do not need to know which encoder the server runs.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Serializer(ABC):
+    name = None
+
+    @abstractmethod
+    def dumps(self, data: object):
+        pass
+
+    @abstractmethod
+    def loads(self, payload: bytes) -> object:
+        pass
+
+
+class JsonSerializer(Serializer):
+    name = 'json'
+
+    def dumps(self, data: object) -> str:
+        return json.dumps(data)
+
+    def loads(self, payload: bytes) -> object:
+        return json.loads(payload)
+
+
+class OrjsonSerializer(Serializer):
+    """
+    Same JSON on the wire as JsonSerializer, just faster
+    """
+    name = 'orjson'
+
+    def dumps(self, data: object) -> bytes:
+        return orjson.dumps(data)
+
+    def loads(self, payload: bytes) -> object:
+        return orjson.loads(payload)
+
+
+class MsgpackSerializer(Serializer):
+    name = 'msgpack'
+
+    def dumps(self, data: object) -> bytes:
+        return msgpack.packb(data)
+
+    def loads(self, payload: bytes) -> object:
+        return msgpack.unpackb(payload, strict_map_key=False)
+
+
+JSON = JsonSerializer()
+
+serializers = {'json': JSON}
+if orjson is not None:
+    serializers['orjson'] = OrjsonSerializer()
+if msgpack is not None:
+    serializers['msgpack'] = MsgpackSerializer()
+
+
+def getSerializer(name: Optional[str] = None) -> Serializer:
+    """
+    :param name: json, orjson, msgpack, or fastest for the fastest installed JSON encoder. None means json.
+    """
+    if name is None:
+        return JSON
+    if name == 'fastest':
+        return serializers.get('orjson', JSON)
+    try:
+        return serializers[name]
+    except KeyError:
+        raise ValueError(f'Serializer {name} is not available, installed: {", ".join(serializers)}')
+
+
+def decode(payload) -> object:
+    """
+    Decodes a payload from any serializer. JSON documents start with { or [, anything else is msgpack.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if payload[:1] in (b'{', b'[') or msgpack is None:
+        return serializers.get('orjson', JSON).loads(payload)
+    return serializers['msgpack'].loads(payload)
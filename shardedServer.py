@@ -0,0 +1,125 @@
+"""
+Multi-process game server. A front process subscribes to the game topics and consistently hashes each
+lobby name onto one of N worker processes. Every worker owns the Game objects of its lobbies, runs the
+GameClient dispatch functions on them and publishes results over its own broker connection.
+
+    python shardedServer.py --workers 4
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import multiprocessing
+from functools import lru_cache
+from typing import Optional
+
+import GameClient
+from transport import Message, connectBroker
+
+
+class HashRing:
+    """
+    Consistent hash ring, adding a shard only moves about 1/N of the lobbies
+    """
+
+    def __init__(self, numShards: int, replicas: int = 160):
+        assert isinstance(numShards, int) and numShards > 0
+        points = sorted((HashRing.__hash(f'{shard}:{replica}'), shard)
+                        for shard in range(numShards) for replica in range(replicas))
+        self.__keys = [point for point, _ in points]
+        self.__shards = [shard for _, shard in points]
+        self.shard = lru_cache(maxsize=65536)(self.__lookup)
+
+    def __lookup(self, key: str) -> int:
+        index = bisect.bisect(self.__keys, HashRing.__hash(key)) % len(self.__keys)
+        return self.__shards[index]
+
+    @staticmethod
+    def __hash(key: str) -> int:
+        # Stable across processes, unlike hash() which is salted per interpreter
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+def lobbyName(topic: str, payload: bytes) -> Optional[str]:
+    """
+    :return: Lobby a message belongs to, from the topic or from the new_game payload
+    """
+    topic_list = topic.split("/")
+    if topic_list[0] == 'games' and len(topic_list) >= 3:
+        return topic_list[1]
+    if topic == 'new_game':
+        try:
+            return json.loads(payload)['lobby_name']
+        except (ValueError, KeyError, TypeError):
+            return None
+    return None
+
+
+def runWorker(index: int, inbox: multiprocessing.Queue, verbose: bool = False):
+    """
+    Worker process: owns the lobbies hashed to it and publishes over its own connection
+    :param verbose: Print every message and map, off by default since printing is on the hot path
+    """
+    client = connectBroker(f"GameClient-shard{index}")
+    # Only the front process subscribes, workers get their messages from the inbox
+    GameClient.init_client(client, verbose=verbose, subscribe=False)
+    client.loop_start()
+    try:
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            GameClient.on_message(client, None, message)
+    finally:
+        GameClient.close_client(client)
+        client.loop_stop()
+        client.disconnect()
+
+
+class ShardedServer:
+    def __init__(self, numWorkers: int, verbose: bool = False):
+        self.ring = HashRing(numWorkers)
+        self.inboxes = [multiprocessing.Queue() for _ in range(numWorkers)]
+        self.workers = [multiprocessing.Process(target=runWorker, args=(index, inbox, verbose), name=f'shard{index}', daemon=True)
+                        for index, inbox in enumerate(self.inboxes)]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def route(self, topic: str, payload: bytes):
+        lobby_name = lobbyName(topic, payload)
+        # Messages without a lobby only produce a validation error, any worker can report it
+        shard = 0 if lobby_name is None else self.ring.shard(lobby_name)
+        self.inboxes[shard].put(Message(topic, payload))
+
+    def on_message(self, client, userdata, msg):
+        self.route(msg.topic, msg.payload)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--verbose', action='store_true', help='print every message and map in the workers')
+    args = parser.parse_args()
+
+    server = ShardedServer(args.workers, verbose=args.verbose)
+    server.start()
+
+    client = connectBroker("GameClient-front")
+    client.on_message = server.on_message
+    client.subscribe("new_game")
+    client.subscribe('games/+/start')
+    client.subscribe('games/+/+/move')
+    client.subscribe('games/+/+/resync')
+    try:
+        client.loop_forever()
+    finally:
+        server.stop()
@@ -0,0 +1,127 @@
+"""
+Headless simulation runner. Plays full games between bot strategies (see bots.py) directly on game.Game,
+with no broker and no sleeps, and reports games/s and where the time goes:
+
+    setup    building the Game and the bots
+    observe  getGameData for every player, shaped like the MQTT payload
+    decide   the bots
+    resolve  Game.applyMoves
+
+    python simulate.py --bots greedy explorer --games 1000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, Optional
+
+from bots import STRATEGIES, toMove
+from game import Game
+
+PHASES = ('setup', 'observe', 'decide', 'resolve')
+
+
+def wireState(gameData: dict) -> dict:
+    """
+    getGameData as a client sees it after JSON decoding: positions are lists, not tuples
+    """
+    return {'teammateNames': list(gameData['teammateNames']),
+            'teammatePositions': [list(loc) for loc in gameData['teammatePositions']],
+            'enemyPositions': [list(loc) for loc in gameData['enemyPositions']],
+            'currentPosition': list(gameData['currentPosition']),
+            'coin1': [list(loc) for loc in gameData['coin1']],
+            'coin2': [list(loc) for loc in gameData['coin2']],
+            'coin3': [list(loc) for loc in gameData['coin3']],
+            'walls': [list(loc) for loc in gameData['walls']]}
+
+
+def playGame(strategies: list[Callable], seed: int, playersPerTeam: int = 2, width: int = 10, height: int = 10,
+             maxTurns: int = 300, timings: Optional[dict[str, float]] = None) -> dict:
+    """
+    Plays one game with one team per strategy until every coin is collected or maxTurns have passed
+    :param strategies: Bot classes, team i is played by strategies[i]
+    :param seed: Seeds the map and the bots, the same seed replays the same game
+    :param timings: Seconds per phase are added to it
+    :return: {seed, turns, finished, scores: [score of team i, ...], coins: [coins collected by team i, ...],
+              winner: team index or None for a draw}
+    """
+    clock = time.perf_counter
+    phases = timings if timings is not None else dict.fromkeys(PHASES, 0.0)
+
+    start = clock()
+    teams = {f'Team{i}': [f'Team{i}Player{j}' for j in range(playersPerTeam)] for i in range(len(strategies))}
+    game = Game(teams, width, height, seed=seed)
+    bots = {}
+    for i, (strategy, players) in enumerate(zip(strategies, teams.values())):
+        bot = strategy(random.Random(seed * len(strategies) + i), height, width)
+        for playerName in players:
+            bots[playerName] = bot
+    names = list(bots)
+    coins = dict.fromkeys(teams, 0)
+    phases['setup'] += clock() - start
+
+    turns = 0
+    while turns < maxTurns and not game.gameOver():
+        start = clock()
+        states = [wireState(game.getGameData(name)) for name in names]
+        observed = clock()
+        moves = []
+        for name, state in zip(names, states):
+            move = toMove(bots[name](name, state))
+            if move is not None:
+                moves.append((name, move))
+        decided = clock()
+        for team, collected in game.applyMoves(moves)['coins'].items():
+            coins[team] += collected
+        resolved = clock()
+        phases['observe'] += observed - start
+        phases['decide'] += decided - observed
+        phases['resolve'] += resolved - decided
+        turns += 1
+
+    scores = [game.teams[team].score for team in teams]
+    best = max(scores)
+    return {'seed': seed,
+            'turns': turns,
+            'finished': game.gameOver(),
+            'scores': scores,
+            'coins': [coins[team] for team in teams],
+            'winner': scores.index(best) if scores.count(best) == 1 else None}
+
+
+def runGames(strategies: list[Callable], games: int, seed: int = 0, **options) -> tuple[list[dict], dict[str, float], float]:
+    """
+    :param options: Passed on to playGame
+    :return: (results, seconds per phase, total seconds)
+    """
+    timings = dict.fromkeys(PHASES, 0.0)
+    start = time.perf_counter()
+    results = [playGame(strategies, seed + i, timings=timings, **options) for i in range(games)]
+    return results, timings, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bots', nargs='+', default=['greedy', 'explorer'], choices=sorted(STRATEGIES),
+                        help='one strategy per team')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--players', type=int, default=2, help='players per team')
+    parser.add_argument('--size', type=int, default=10, help='board height and width')
+    parser.add_argument('--max-turns', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results, timings, elapsed = runGames([STRATEGIES[name] for name in args.bots], args.games, args.seed,
+                                         playersPerTeam=args.players, width=args.size, height=args.size,
+                                         maxTurns=args.max_turns)
+
+    turns = sum(result['turns'] for result in results)
+    print(f'{args.games} games in {elapsed:.2f}s: {args.games / elapsed:.0f} games/s, {turns / elapsed:.0f} turns/s, '
+          f'{sum(result["finished"] for result in results)} finished before {args.max_turns} turns')
+    for phase in PHASES:
+        print(f'{phase:>8} {timings[phase] * 1000 / args.games:8.3f} ms/game {timings[phase] / elapsed:6.1%}')
+    for i, name in enumerate(args.bots):
+        wins = sum(result['winner'] == i for result in results)
+        coins = sum(result['coins'][i] for result in results)
+        points = sum(result['scores'][i] for result in results)
+        print(f'{f"Team{i} {name}":>16} {wins / args.games:6.1%} wins {coins / turns:.3f} coins/turn {points / turns:.3f} points/turn')
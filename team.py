@@ -4,11 +4,14 @@ Author: Charles Lee
 
 from __future__ import annotations
 from typing import TYPE_CHECKING
+from validation import DEBUG
 if TYPE_CHECKING:
     from player import Player
 
 
 class Team:
+    __slots__ = ('__name', 'players', '__score')
+
     def __init__(self, teamName: str):
         assert isinstance(teamName, str)
         self.__name = teamName
@@ -28,5 +31,6 @@ class Team:
         self.players.append(player)
 
     def increaseScore(self, value: int):
-        assert isinstance(value, int)
+        if DEBUG:
+            assert isinstance(value, int)
         self.__score += value
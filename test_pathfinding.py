@@ -0,0 +1,142 @@
+import random
+
+from moveset import Moveset
+from pathfinding import astar, bfs, descend, distanceField
+
+# A wall down column 4 with a gap in the bottom row
+WALLS = {(row, 4) for row in range(9)}
+
+
+def walk(start, moves, height, width, blocked=()):
+    """
+    :return: Cell reached after moves, asserting every step stays on the board and off blocked cells
+    """
+    x, y = start
+    for i, move in enumerate(moves):
+        x, y = x + move.value[0], y + move.value[1]
+        assert 0 <= x < height and 0 <= y < width
+        # Only the last cell may be blocked, that is the goal
+        assert i == len(moves) - 1 or (x, y) not in blocked
+    return x, y
+
+
+def test_bfs_reaches_nearest_goal():
+    path = bfs((0, 0), {(0, 9), (9, 0)}, 10, 10, WALLS)
+    assert walk((0, 0), path, 10, 10, WALLS) == (9, 0)
+    assert len(path) == 9
+
+
+def test_bfs_goes_around_walls():
+    path = bfs((0, 0), {(0, 9)}, 10, 10, WALLS)
+    assert walk((0, 0), path, 10, 10, WALLS) == (0, 9)
+    assert len(path) == 27
+
+
+def test_bfs_start_is_goal():
+    assert bfs((3, 3), {(3, 3), (0, 0)}, 10, 10) == []
+
+
+def test_bfs_unreachable_goal():
+    walls = {(row, 4) for row in range(10)}
+    assert bfs((0, 0), {(0, 9)}, 10, 10, walls) is None
+
+
+def test_bfs_blocked_goal_is_reachable():
+    blocked = {(0, 3), (1, 1)}
+    path = bfs((0, 0), {(0, 3)}, 10, 10, blocked)
+    assert walk((0, 0), path, 10, 10, blocked) == (0, 3)
+    assert len(path) == 3
+
+
+def test_astar_matches_bfs_length():
+    rng = random.Random(0)
+    for _ in range(200):
+        blocked = {(rng.randrange(8), rng.randrange(8)) for _ in range(20)}
+        start, goal = (rng.randrange(8), rng.randrange(8)), (rng.randrange(8), rng.randrange(8))
+        blocked.discard(start)
+        expected = bfs(start, {goal}, 8, 8, blocked)
+        path = astar(start, goal, 8, 8, blocked)
+        if expected is None:
+            assert path is None
+        else:
+            assert len(path) == len(expected)
+            assert walk(start, path, 8, 8, blocked) == goal
+
+
+def test_astar_start_is_goal():
+    assert astar((5, 5), (5, 5), 10, 10, WALLS) == []
+
+
+def test_astar_unreachable_goal():
+    walls = {(row, 4) for row in range(10)}
+    assert astar((0, 0), (0, 9), 10, 10, walls) is None
+
+
+def test_astar_blocked_goal_is_reachable():
+    path = astar((0, 0), (0, 4), 10, 10, WALLS)
+    assert path == [Moveset.RIGHT] * 4
+
+
+def test_distance_field():
+    field = distanceField([(0, 9)], 10, 10, WALLS)
+    assert field[0][9] == 0
+    assert field[0][0] == 27
+    assert field[9][4] == 14
+    # Walls are never reached
+    assert all(field[x][y] is None for x, y in WALLS)
+
+
+def test_distance_field_sources():
+    field = distanceField([(0, 0), (9, 9), (0, 0), (20, 20)], 10, 10)
+    assert field[0][0] == 0 and field[9][9] == 0
+    assert field[0][9] == 9
+    assert field[4][4] == 8
+
+
+def test_distance_field_blocked_source():
+    field = distanceField([(0, 4)], 10, 10, WALLS)
+    assert field[0][4] == 0
+    assert field[0][3] == 1 and field[0][5] == 1
+
+
+def test_distance_field_unreachable():
+    walls = {(row, 4) for row in range(10)}
+    field = distanceField([(0, 9)], 10, 10, walls)
+    assert all(field[x][y] is None for x in range(10) for y in range(4))
+    assert all(field[x][y] is not None for x in range(10) for y in range(5, 10))
+
+
+def test_descend_follows_field():
+    field = distanceField([(0, 9)], 10, 10, WALLS)
+    loc, moves = (0, 0), 0
+    while field[loc[0]][loc[1]] != 0:
+        move = descend(field, loc, WALLS)
+        loc = walk(loc, [move], 10, 10, WALLS)
+        moves += 1
+    assert loc == (0, 9)
+    assert moves == 27
+
+
+def test_descend_at_source():
+    field = distanceField([(2, 2)], 10, 10)
+    assert descend(field, (2, 2)) is None
+
+
+def test_descend_unreachable():
+    walls = {(row, 4) for row in range(10)}
+    field = distanceField([(0, 9)], 10, 10, walls)
+    assert descend(field, (0, 0), walls) is None
+
+
+def test_descend_onto_blocked_source():
+    blocked = {(0, 1)}
+    field = distanceField([(0, 1)], 10, 10, blocked)
+    assert descend(field, (0, 0), blocked) == Moveset.RIGHT
+
+
+def test_descend_avoids_blocked_cells():
+    field = distanceField([(0, 2)], 10, 10)
+    # The only closer cell is taken by another player, so no move gets nearer
+    assert descend(field, (0, 0), {(0, 1)}) is None
+    # With one closer cell taken the other one is used
+    assert descend(field, (1, 1), {(0, 1)}) == Moveset.RIGHT
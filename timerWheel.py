@@ -0,0 +1,87 @@
+"""
+Hashed timer wheel: one thread serves the timers of every lobby. Timers land in the slot of the tick they
+expire on, so scheduling and cancelling are O(1) and each tick only looks at one slot.
+"""
+
+import math
+import threading
+import time
+import traceback
+from typing import Callable
+
+
+class Timer:
+    __slots__ = ('tick', 'callback', 'args', 'cancelled')
+
+    def __init__(self, tick: int, callback: Callable, args: tuple):
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, tickSeconds: float = 0.05, numSlots: int = 512, start: bool = True):
+        """
+        :param tickSeconds: Timer resolution, timers fire up to one tick late
+        :param numSlots: Slots on the wheel, delays longer than numSlots ticks wrap around
+        """
+        assert tickSeconds > 0 and numSlots > 0
+        self.tickSeconds = tickSeconds
+        self.__slots: list[list[Timer]] = [[] for _ in range(numSlots)]
+        self.__tick = 0
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        if start:
+            self.start()
+
+    def start(self):
+        if self.__thread is None:
+            self.__origin = time.monotonic() - self.__tick * self.tickSeconds
+            self.__thread = threading.Thread(target=self.__run, name='TimerWheel', daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """
+        Calls callback(*args) on the wheel thread after delay seconds
+        :return: Handle that can cancel the timer
+        """
+        ticks = max(1, math.ceil(delay / self.tickSeconds))
+        with self.__lock:
+            timer = Timer(self.__tick + ticks, callback, args)
+            self.__slots[timer.tick % len(self.__slots)].append(timer)
+        return timer
+
+    def advance(self, ticks: int = 1):
+        """
+        Moves the wheel forward and fires everything that expired, used by the wheel thread
+        """
+        for _ in range(ticks):
+            with self.__lock:
+                self.__tick += 1
+                slot = self.__slots[self.__tick % len(self.__slots)]
+                expired = [timer for timer in slot if timer.tick <= self.__tick]
+                slot[:] = [timer for timer in slot if timer.tick > self.__tick and not timer.cancelled]
+            for timer in expired:
+                if not timer.cancelled:
+                    try:
+                        timer.callback(*timer.args)
+                    except Exception:
+                        traceback.print_exc()
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            due = int((time.monotonic() - self.__origin) / self.tickSeconds)
+            if due > self.__tick:
+                self.advance(due - self.__tick)
+            self.__stopped.wait(self.__origin + (self.__tick + 1) * self.tickSeconds - time.monotonic())
@@ -0,0 +1,259 @@
+"""
+Tournament between bot strategies (see bots.py). Every pair of strategies plays the same seeded maps from both
+sides, the matches are spread over a ProcessPoolExecutor and every result is appended to a JSON lines file as
+soon as its batch completes. Running the same command again skips the matches already in the file, so an
+interrupted tournament picks up where it stopped.
+
+    python tournament.py --bots greedy explorer path --games 2000 --out results.jsonl
+    python tournament.py --out results.jsonl --report
+
+Reports per strategy win rates with Wilson 95% intervals, and coins and points per turn with normal 95% intervals.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Optional
+
+from bots import STRATEGIES
+from simulate import playGame
+
+Z95 = 1.96
+
+
+def ignoreInterrupts():
+    """
+    Worker initializer. Ctrl-C reaches the whole process group, only the parent should act on it.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def playBatch(matches: list[tuple[tuple[str, ...], int]], options: dict) -> list[dict]:
+    """
+    Runs in a worker process. Strategies travel by name so only strings are pickled.
+    :param matches: [(strategy names, seed), ...]
+    :param options: Passed on to simulate.playGame
+    """
+    results = []
+    for names, seed in matches:
+        result = playGame([STRATEGIES[name] for name in names], seed, **options)
+        result['bots'] = list(names)
+        result.update(options)
+        results.append(result)
+    return results
+
+
+def schedule(bots: list[str], games: int, seed: int = 0) -> list[tuple[tuple[str, ...], int]]:
+    """
+    :return: Every pair of bots on seeds seed..seed+games-1, each seed played from both sides
+    """
+    matches = []
+    for first, second in itertools.combinations(bots, 2):
+        for s in range(seed, seed + games):
+            matches.append(((first, second), s))
+            matches.append(((second, first), s))
+    return matches
+
+
+def matchKey(names: Iterable[str], seed: int, options: dict) -> tuple:
+    return (tuple(names), seed, options['playersPerTeam'], options['width'], options['height'], options['maxTurns'])
+
+
+def loadResults(path: Optional[str]) -> list[dict]:
+    """
+    :return: Results already written to path. A line cut short by an interruption is dropped and replayed.
+    """
+    results = []
+    if path is None or not os.path.exists(path):
+        return results
+    with open(path) as lines:
+        for line in lines:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return results
+
+
+def trimPartialLine(path: str):
+    """
+    Cuts a line left unfinished by an interruption off the end of path, so appended results start on a line of their own
+    """
+    with open(path, 'rb+') as log:
+        end = position = log.seek(0, os.SEEK_END)
+        while position > 0:
+            step = min(position, 4096)
+            log.seek(position - step)
+            newline = log.read(step).rfind(b'\n')
+            if newline != -1:
+                position += newline + 1 - step
+                break
+            position -= step
+        if position != end:
+            log.truncate(position)
+
+
+def runTournament(matches: list[tuple[tuple[str, ...], int]], options: dict, out: Optional[str] = None,
+                  workers: Optional[int] = None, batchSize: int = 16, verbose: bool = True) -> list[dict]:
+    """
+    Plays the matches that are not in out yet and appends their results to it as they come in
+    :param options: Passed on to simulate.playGame
+    :param workers: Worker processes, every core by default
+    :param batchSize: Matches per task, enough to amortize pickling a task against a few ms per game
+    :return: Every result for matches, including ones loaded from out
+    """
+    wanted = {matchKey(names, seed, options) for names, seed in matches}
+    results = [result for result in loadResults(out) if matchKey(result['bots'], result['seed'], result) in wanted]
+    done = {matchKey(result['bots'], result['seed'], result) for result in results}
+    todo = [match for match in matches if matchKey(*match, options) not in done]
+    if verbose and done:
+        print(f'resuming: {len(done)} of {len(wanted)} matches already played', file=sys.stderr)
+    if not todo:
+        return results
+
+    if out is not None and os.path.exists(out):
+        trimPartialLine(out)
+    log = open(out, 'a') if out is not None else None
+    start = time.perf_counter()
+    played = 0
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=ignoreInterrupts)
+    try:
+        futures = [executor.submit(playBatch, todo[i:i + batchSize], options) for i in range(0, len(todo), batchSize)]
+        for future in as_completed(futures):
+            batch = future.result()
+            if log is not None:
+                log.writelines(json.dumps(result) + '\n' for result in batch)
+                log.flush()
+            results.extend(batch)
+            played += len(batch)
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f'\r{played}/{len(todo)} matches, {played / elapsed:.0f} games/s', end='', file=sys.stderr)
+    finally:
+        # On an interruption pending batches are dropped, finished ones are already in the log
+        executor.shutdown(wait=True, cancel_futures=True)
+        if log is not None:
+            log.close()
+        if verbose:
+            print(file=sys.stderr)
+    return results
+
+
+def wilson(successes: int, trials: int, z: float = Z95) -> tuple[float, float]:
+    """
+    :return: Wilson score interval of a binomial proportion
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def meanInterval(values: list[float], z: float = Z95) -> tuple[float, float]:
+    """
+    :return: (mean, half width of its normal interval)
+    """
+    if not values:
+        return 0.0, 0.0
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, math.inf
+    variance = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+    return mean, z * math.sqrt(variance / len(values))
+
+
+def summarize(results: list[dict]) -> dict[str, dict]:
+    """
+    :return: {strategy: {games, wins, draws, winRate, winRateCI, coinsPerTurn, coinsPerTurnCI, pointsPerTurn,
+             pointsPerTurnCI}}, a game counts for every team a strategy plays in it. Results logged without coin
+             counts are left out of coinsPerTurn.
+    """
+    games: dict[str, list[tuple[Optional[bool], Optional[float], float]]] = {}
+    for result in results:
+        turns = max(result['turns'], 1)
+        for i, name in enumerate(result['bots']):
+            won = None if result['winner'] is None else result['winner'] == i
+            coins = result['coins'][i] / turns if 'coins' in result else None
+            games.setdefault(name, []).append((won, coins, result['scores'][i] / turns))
+
+    summary = {}
+    for name, outcomes in games.items():
+        wins = sum(won is True for won, _, _ in outcomes)
+        coinsPerTurn, coinsMargin = meanInterval([coins for _, coins, _ in outcomes if coins is not None])
+        pointsPerTurn, pointsMargin = meanInterval([points for _, _, points in outcomes])
+        summary[name] = {'games': len(outcomes),
+                         'wins': wins,
+                         'draws': sum(won is None for won, _, _ in outcomes),
+                         'winRate': wins / len(outcomes),
+                         'winRateCI': wilson(wins, len(outcomes)),
+                         'coinsPerTurn': coinsPerTurn,
+                         'coinsPerTurnCI': (coinsPerTurn - coinsMargin, coinsPerTurn + coinsMargin),
+                         'pointsPerTurn': pointsPerTurn,
+                         'pointsPerTurnCI': (pointsPerTurn - pointsMargin, pointsPerTurn + pointsMargin)}
+    return summary
+
+
+def headToHead(results: list[dict]) -> dict[tuple[str, str], list[int]]:
+    """
+    :return: {(a, b): [wins of a, wins of b, draws]} with a before b alphabetically
+    """
+    table: dict[tuple[str, str], list[int]] = {}
+    for result in results:
+        pair = tuple(sorted(result['bots']))
+        row = table.setdefault(pair, [0, 0, 0])
+        if result['winner'] is None:
+            row[2] += 1
+        else:
+            row[pair.index(result['bots'][result['winner']])] += 1
+    return table
+
+
+def printReport(results: list[dict]):
+    print(f'{len(results)} games')
+    for name, stats in sorted(summarize(results).items(), key=lambda item: -item[1]['winRate']):
+        low, high = stats['winRateCI']
+        coins, (coinsLow, coinsHigh) = stats['coinsPerTurn'], stats['coinsPerTurnCI']
+        points, (pointsLow, pointsHigh) = stats['pointsPerTurn'], stats['pointsPerTurnCI']
+        print(f'{name:>10} {stats["games"]:6} games {stats["winRate"]:6.1%} wins [{low:.1%}, {high:.1%}] '
+              f'{stats["draws"] / stats["games"]:6.1%} draws {coins:.4f} coins/turn [{coinsLow:.4f}, {coinsHigh:.4f}] '
+              f'{points:.4f} points/turn [{pointsLow:.4f}, {pointsHigh:.4f}]')
+    for (first, second), (firstWins, secondWins, draws) in sorted(headToHead(results).items()):
+        print(f'{first:>10} vs {second:<10} {firstWins:6} - {secondWins:<6} {draws} draws')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bots', nargs='+', default=['greedy', 'explorer'], choices=sorted(STRATEGIES))
+    parser.add_argument('--games', type=int, default=1000, help='seeds per pair, each played from both sides')
+    parser.add_argument('--players', type=int, default=2, help='players per team')
+    parser.add_argument('--size', type=int, default=10, help='board height and width')
+    parser.add_argument('--max-turns', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, every core by default')
+    parser.add_argument('--batch', type=int, default=16, help='matches per task')
+    parser.add_argument('--out', default=None, metavar='PATH', help='JSON lines results file, resumed if it exists')
+    parser.add_argument('--report', action='store_true', help='only report on the results already in --out')
+    args = parser.parse_args()
+
+    if args.report:
+        if args.out is None:
+            parser.error('--report needs --out')
+        printReport(loadResults(args.out))
+    else:
+        if len(set(args.bots)) < 2:
+            parser.error('a tournament needs at least two different strategies')
+        options = {'playersPerTeam': args.players, 'width': args.size, 'height': args.size, 'maxTurns': args.max_turns}
+        matches = schedule(list(dict.fromkeys(args.bots)), args.games, args.seed)
+        start = time.perf_counter()
+        results = runTournament(matches, options, args.out, args.workers, args.batch)
+        print(f'{time.perf_counter() - start:.1f}s, {os.cpu_count()} cores')
+        printReport(results)
@@ -0,0 +1,228 @@
+"""
+Transports for the game server and bots. Everything that talks MQTT only uses the small part of the paho
+client API below, so the same code runs against a real broker or entirely in-process:
+
+    publish(topic, payload), subscribe(topic), on_message(client, userdata, msg), loop_forever/loop_start/loop_stop
+
+connectBroker gives a paho client connected with credentials.env. LoopbackBroker routes topics, including the
++ and # wildcards, between LoopbackClients in the same process with no network, TLS or serialization.
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+
+class Message:
+    """
+    Stand-in for paho's MQTTMessage with the fields the message handlers read. Picklable.
+    """
+    __slots__ = ('topic', 'payload', 'qos')
+
+    def __init__(self, topic: str, payload: bytes, qos: int = 0):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+
+
+def connectBroker(client_id: str):
+    """
+    :return: paho client connected to the broker configured in credentials.env, network loop not started
+    """
+    import paho.mqtt.client as paho
+    from paho import mqtt
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path='./credentials.env')
+
+    broker_address = os.environ.get('BROKER_ADDRESS')
+    broker_port = int(os.environ.get('BROKER_PORT'))
+    username = os.environ.get('USER_NAME')
+    password = os.environ.get('PASSWORD')
+
+    client = paho.Client(callback_api_version=paho.CallbackAPIVersion.VERSION1, client_id=client_id, userdata=None, protocol=paho.MQTTv5)
+    # enable TLS for secure connection
+    client.tls_set(tls_version=mqtt.client.ssl.PROTOCOL_TLS)
+    # set username and password
+    client.username_pw_set(username, password)
+    client.connect(broker_address, broker_port)
+    return client
+
+
+def topicMatches(pattern: str, topic: str) -> bool:
+    """
+    MQTT topic filter matching, + matches one level and a trailing # any number of levels
+    """
+    patternLevels = pattern.split('/')
+    topicLevels = topic.split('/')
+    for index, level in enumerate(patternLevels):
+        if level == '#':
+            return True
+        if index >= len(topicLevels) or (level != '+' and level != topicLevels[index]):
+            return False
+    return len(patternLevels) == len(topicLevels)
+
+
+class LoopbackBroker:
+    """
+    In-process broker. Published messages are queued and delivered in order by whichever thread runs
+    run() or pump(), so handlers that publish from inside on_message do not recurse. Only one thread delivers
+    at a time, and clients calling loop_start share a single broker thread.
+    Subscriptions are resolved once per distinct topic and cached until they change.
+    """
+
+    def __init__(self):
+        self.__subscriptions: list[tuple[str, 'LoopbackClient']] = []
+        self.__routes: dict[str, list['LoopbackClient']] = {}
+        self.__queue = deque()
+        self.__ready = threading.Condition()
+        self.__delivering = threading.RLock()
+        self.__stopped = False
+        # Broker thread and its stop event while any client is attached
+        self.__thread: Optional[tuple[threading.Thread, threading.Event]] = None
+        self.__attached = 0
+        self.published = 0
+        self.delivered = 0
+
+    def client(self, client_id: str = '') -> 'LoopbackClient':
+        return LoopbackClient(self, client_id)
+
+    def subscribe(self, client: 'LoopbackClient', pattern: str):
+        if (pattern, client) not in self.__subscriptions:
+            self.__subscriptions.append((pattern, client))
+            self.__routes.clear()
+
+    def unsubscribe(self, client: 'LoopbackClient', pattern: str):
+        if (pattern, client) in self.__subscriptions:
+            self.__subscriptions.remove((pattern, client))
+            self.__routes.clear()
+
+    def unsubscribeAll(self, client: 'LoopbackClient'):
+        self.__subscriptions = [(pattern, other) for pattern, other in self.__subscriptions if other is not client]
+        self.__routes.clear()
+
+    def publish(self, topic: str, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        elif payload is None:
+            payload = b''
+        with self.__ready:
+            self.__queue.append(Message(topic, payload))
+            self.published += 1
+            self.__ready.notify()
+
+    def pump(self, limit: Optional[int] = None) -> int:
+        """
+        Delivers queued messages, including ones published while delivering, until the queue is empty
+        or limit messages have been delivered
+        :return: Number of messages delivered
+        """
+        queue = self.__queue
+        delivered = 0
+        with self.__delivering:
+            while queue and (limit is None or delivered < limit):
+                message = queue.popleft()
+                for client in self.__route(message.topic):
+                    if client.on_message is not None:
+                        client.on_message(client, client.userdata, message)
+                delivered += 1
+            self.delivered += delivered
+        return delivered
+
+    def run(self, until: Optional[Callable[[], bool]] = None):
+        """
+        Delivers messages as they arrive until stop() is called or until() returns True
+        """
+        while not self.__stopped and (until is None or not until()):
+            with self.__ready:
+                if not self.__queue:
+                    self.__ready.wait(0.05)
+            self.pump(1000)
+
+    def stop(self):
+        """
+        Ends every run() loop for good, including the broker thread
+        """
+        with self.__ready:
+            self.__stopped = True
+            self.__ready.notify_all()
+
+    def attach(self):
+        """
+        Starts the broker thread for the first attached client, the ones after it share that thread
+        """
+        with self.__ready:
+            self.__attached += 1
+            if self.__thread is None:
+                stopped = threading.Event()
+                thread = threading.Thread(target=self.run, args=(stopped.is_set,), name='loopback-broker', daemon=True)
+                self.__thread = (thread, stopped)
+                thread.start()
+
+    def detach(self):
+        """
+        Stops the broker thread once the last attached client has detached
+        """
+        with self.__ready:
+            if self.__attached == 0:
+                return
+            self.__attached -= 1
+            if self.__attached or self.__thread is None:
+                return
+            (thread, stopped), self.__thread = self.__thread, None
+            stopped.set()
+            self.__ready.notify_all()
+        # A handler may stop the loop of its own client, the thread then ends after the current delivery
+        if thread is not threading.current_thread():
+            thread.join()
+
+    def pending(self) -> int:
+        return len(self.__queue)
+
+    def __route(self, topic: str) -> list['LoopbackClient']:
+        clients = self.__routes.get(topic)
+        if clients is None:
+            clients = self.__routes[topic] = list(dict.fromkeys(
+                client for pattern, client in self.__subscriptions if topicMatches(pattern, topic)))
+        return clients
+
+
+class LoopbackClient:
+    """
+    Client of a LoopbackBroker with the paho calls the game code uses. Any attributes can be stashed on it
+    like on a paho client.
+    """
+
+    def __init__(self, broker: LoopbackBroker, client_id: str = '', userdata=None):
+        self.broker = broker
+        self.client_id = client_id
+        self.userdata = userdata
+        self.on_message: Optional[Callable] = None
+        self.__looping = False
+
+    def publish(self, topic: str, payload=None, qos: int = 0, retain: bool = False):
+        self.broker.publish(topic, payload)
+
+    def subscribe(self, topic: str, qos: int = 0):
+        self.broker.subscribe(self, topic)
+
+    def unsubscribe(self, topic: str):
+        self.broker.unsubscribe(self, topic)
+
+    def loop_forever(self):
+        self.broker.run()
+
+    def loop_start(self):
+        if not self.__looping:
+            self.__looping = True
+            self.broker.attach()
+
+    def loop_stop(self):
+        # Only detaches this client, the broker keeps delivering for the others
+        if self.__looping:
+            self.__looping = False
+            self.broker.detach()
+
+    def disconnect(self):
+        self.broker.unsubscribeAll(self)
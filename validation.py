@@ -0,0 +1,20 @@
+"""
+Validation mode, read once from GAME_VALIDATION when the game modules are imported.
+
+    debug       Every call checks its arguments, including internal hot paths such as Map.get/set,
+                Player.loc and Team.increaseScore. The default.
+    production  Only the public Game API (movePlayer, applyMoves, getPlayer, getGameData) checks its input.
+                Internal methods trust their callers.
+
+Running with python -O strips the remaining asserts as well.
+"""
+
+import os
+
+MODES = ('debug', 'production')
+
+MODE = os.environ.get('GAME_VALIDATION', 'debug')
+if MODE not in MODES:
+    raise ValueError(f'GAME_VALIDATION must be one of {", ".join(MODES)}, not {MODE}')
+
+DEBUG = MODE == 'debug'
@@ -0,0 +1,221 @@
+from map import Map
+from player import Player
+from gameItems import *
+from typing import Iterable, Optional
+
+
+# Observers of a block nobody is near
+NOBODY = frozenset()
+
+
+class VisionIndex:
+    """
+    Keeps, for every player, the non-empty cells inside their vision window so that game data can be
+    built from what changed instead of rescanning the whole (2r+1)^2 window on every call.
+    Each window remembers the center it was scanned at and is only shifted to where its player stands when
+    their game data is read, so a move costs O(players that can see it) and players that move several times
+    between reads pay for the shift once.
+    Windows are bucketed by that center into (2r+1)x(2r+1) blocks of the map. Every block keeps the players
+    whose window is centered in it or in one of its eight neighbours, so the players that can see a cell are
+    found with a single lookup instead of by checking every player. Built game data is cached per player until
+    something in their window changes.
+    The index has to be told about every change to the map, see playerMoved, playersMoved and cellChanged.
+    """
+
+    def __init__(self, map: Map, players: list[Player], visionRadius: int = 2):
+        assert isinstance(visionRadius, int)
+        self.__map = map
+        self.__players = players
+        self.__radius = visionRadius
+        # Keyed by Player rather than by name, players hash by identity without going through the name property
+        # {player: {loc: (gameData key, teammate name or None)}} for the window around __centers[player]
+        self.__visible: dict[Player, dict[tuple[int, int], tuple[str, Optional[str]]]] = {}
+        # {player: center the window in __visible was scanned at}
+        self.__centers: dict[Player, tuple[int, int]] = {}
+        self.__size = 2*visionRadius + 1
+        # {(x // (2r+1), y // (2r+1)): players whose window is centered in that block or one next to it}
+        self.__neighbourhoods: dict[tuple[int, int], set[Player]] = {}
+        # {player: gameData lists in row-major order}, dropped whenever the player's window changes
+        self.__built: dict[Player, dict[str, list]] = {}
+
+        for player in players:
+            self.__visible[player] = self.__scan(player.loc, player)
+            self.__centers[player] = player.loc
+            self.__enter(player, self.__bucket(player.loc))
+
+    @property
+    def visionRadius(self):
+        return self.__radius
+
+    def gameData(self, player: Player) -> dict:
+        """
+        :return: Same dictionary as Game.getGameData, built from the cached window
+        """
+        if self.__centers[player] != player.loc:
+            self.__shiftWindow(player)
+        built = self.__built.get(player)
+        if built is None:
+            built = self.__built[player] = self.__build(player)
+        return {'teammateNames': built['teammateNames'][:],
+                'teammatePositions': built['teammatePositions'][:],
+                'enemyPositions': built['enemyPositions'][:],
+                'currentPosition': player.loc,
+                'coin1': built['coin1'][:],
+                'coin2': built['coin2'][:],
+                'coin3': built['coin3'][:],
+                'walls': built['walls'][:]}
+
+    def __build(self, player: Player) -> dict[str, list]:
+        built = {'teammateNames': [],
+                 'teammatePositions': [],
+                 'enemyPositions': [],
+                 'coin1': [],
+                 'coin2': [],
+                 'coin3': [],
+                 'walls': []}
+
+        visible = self.__visible[player]
+        # Sorted so the lists come out in the same row-major order as a full window scan
+        for loc in sorted(visible):
+            key, teammateName = visible[loc]
+            built[key].append(loc)
+            if teammateName is not None:
+                built['teammateNames'].append(teammateName)
+
+        return built
+
+    def playerMoved(self, player: Player, oldLoc: tuple[int, int], newLoc: tuple[int, int]):
+        """
+        Updates the index after player moved from oldLoc to newLoc, picking up whatever was on newLoc.
+        The player's own window is shifted later, by gameData.
+        """
+        self.playersMoved(((player, oldLoc, newLoc),))
+
+    def playersMoved(self, moves: Iterable[tuple[Player, tuple[int, int], tuple[int, int]]]):
+        """
+        Same as calling playerMoved for every (player, oldLoc, newLoc) in order, for a whole round in one call
+        """
+        r, size, centers, built = self.__radius, self.__size, self.__centers, self.__built
+        allVisible, neighbourhoods = self.__visible, self.__neighbourhoods
+        for player, oldLoc, newLoc in moves:
+            oldBucket, newBucket = (oldLoc[0] // size, oldLoc[1] // size), (newLoc[0] // size, newLoc[1] // size)
+            observers = neighbourhoods.get(oldBucket, NOBODY)
+            if newBucket != oldBucket:
+                observers = observers | neighbourhoods.get(newBucket, NOBODY)
+            for observer in observers:
+                if observer is player:
+                    continue
+                visible = allVisible[observer]
+                centerX, centerY = centers[observer]
+                if abs(centerX - oldLoc[0]) <= r and abs(centerY - oldLoc[1]) <= r:
+                    visible.pop(oldLoc, None)
+                    built.pop(observer, None)
+                if abs(centerX - newLoc[0]) <= r and abs(centerY - newLoc[1]) <= r:
+                    visible[newLoc] = VisionIndex.__categorize(player, observer)
+                    built.pop(observer, None)
+
+            # The cell the player stepped onto is now the player itself
+            allVisible[player].pop(newLoc, None)
+            built.pop(player, None)
+
+    def cellChanged(self, loc: tuple[int, int]):
+        """
+        Re-reads a single cell from the map for every player that can see it
+        """
+        cell = self.__map.get(loc)
+        for observer in self.__neighbourhoods.get(self.__bucket(loc), NOBODY):
+            if cell is observer or not self.__inWindow(self.__centers[observer], loc):
+                continue
+            self.__built.pop(observer, None)
+            entry = VisionIndex.__categorize(cell, observer)
+            if entry is None:
+                self.__visible[observer].pop(loc, None)
+            else:
+                self.__visible[observer][loc] = entry
+
+    def __bucket(self, loc: tuple[int, int]) -> tuple[int, int]:
+        return loc[0] // self.__size, loc[1] // self.__size
+
+    def __enter(self, player: Player, bucket: tuple[int, int]):
+        # A window centered in bucket sees cells of the blocks next to it, and no further
+        bucketX, bucketY = bucket
+        for x in range(bucketX-1, bucketX+2):
+            for y in range(bucketY-1, bucketY+2):
+                self.__neighbourhoods.setdefault((x, y), set()).add(player)
+
+    def __leave(self, player: Player, bucket: tuple[int, int]):
+        bucketX, bucketY = bucket
+        for x in range(bucketX-1, bucketX+2):
+            for y in range(bucketY-1, bucketY+2):
+                self.__neighbourhoods[(x, y)].discard(player)
+
+    def __inWindow(self, center: tuple[int, int], loc: tuple[int, int]) -> bool:
+        return abs(center[0] - loc[0]) <= self.__radius and abs(center[1] - loc[1]) <= self.__radius
+
+    def __bounds(self, center: tuple[int, int]):
+        centerX, centerY = center
+        minX = max(centerX - self.__radius, 0)
+        maxX = min(centerX + self.__radius, self.__map.height-1)
+        minY = max(centerY - self.__radius, 0)
+        maxY = min(centerY + self.__radius, self.__map.width-1)
+        return minX, maxX, minY, maxY
+
+    def __scan(self, center: tuple[int, int], player: Player) -> dict:
+        visible = {}
+        minX, maxX, minY, maxY = self.__bounds(center)
+        for x in range(minX, maxX+1):
+            for y in range(minY, maxY+1):
+                self.__add(visible, (x, y), player)
+        return visible
+
+    def __add(self, visible: dict, loc: tuple[int, int], observer: Player):
+        entry = VisionIndex.__categorize(self.__map.get(loc), observer)
+        if entry is not None:
+            visible[loc] = entry
+
+    def __shiftWindow(self, player: Player):
+        """
+        Moves player's window from the center it was scanned at to where they stand now, dropping the cells
+        that left it and reading only the cells that entered it
+        """
+        oldCenter, newCenter = self.__centers[player], player.loc
+        self.__built.pop(player, None)
+
+        if abs(newCenter[0] - oldCenter[0]) > 2*self.__radius or abs(newCenter[1] - oldCenter[1]) > 2*self.__radius:
+            self.__visible[player] = self.__scan(newCenter, player)
+        else:
+            visible = self.__visible[player]
+            for loc in [loc for loc in visible if not self.__inWindow(newCenter, loc)]:
+                del visible[loc]
+
+            oldMinX, oldMaxX, oldMinY, oldMaxY = self.__bounds(oldCenter)
+            minX, maxX, minY, maxY = self.__bounds(newCenter)
+            # Rows the old window covered only gained the columns on either side of it
+            sideYs = [y for y in range(minY, maxY+1) if not oldMinY <= y <= oldMaxY]
+            for x in range(minX, maxX+1):
+                for y in sideYs if oldMinX <= x <= oldMaxX else range(minY, maxY+1):
+                    self.__add(visible, (x, y), player)
+
+        oldBucket, newBucket = self.__bucket(oldCenter), self.__bucket(newCenter)
+        if oldBucket != newBucket:
+            self.__leave(player, oldBucket)
+            self.__enter(player, newBucket)
+        self.__centers[player] = newCenter
+
+    @staticmethod
+    def __categorize(cell: object, observer: Player) -> Optional[tuple[str, Optional[str]]]:
+        if isinstance(cell, Player):
+            if cell is observer:
+                return None
+            if cell.team is observer.team:
+                return 'teammatePositions', cell.name
+            return 'enemyPositions', None
+        elif isinstance(cell, Coin1):
+            return 'coin1', None
+        elif isinstance(cell, Coin2):
+            return 'coin2', None
+        elif isinstance(cell, Coin3):
+            return 'coin3', None
+        elif isinstance(cell, Wall):
+            return 'walls', None
+        return None
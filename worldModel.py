@@ -0,0 +1,168 @@
+from gameItems import CellKind
+from typing import Optional
+
+# Cell state of a world model, CellKind codes for what was seen plus one for cells never seen
+UNKNOWN = 255
+
+# Turns UNKNOWN into EMPTY and leaves every other code as it is, see WorldModel.update
+SEEN = bytes(range(UNKNOWN)) + bytes([CellKind.EMPTY])
+
+COIN_KEYS = {'coin1': (CellKind.COIN1, 1), 'coin2': (CellKind.COIN2, 2), 'coin3': (CellKind.COIN3, 3)}
+
+
+class WorldModel:
+    """
+    A bot's memory of the board, folded together from the game_state payloads it receives. Walls stay known
+    once seen, coins are remembered with the turn they were last seen on until a later window shows their cell
+    empty, and players are kept where they were last seen.
+    Cells are stored in a flat bytearray indexed x*width+y, so every lookup is O(1). An update only folds the
+    entries listed in the payload, and clears remembered coins and enemies the window no longer shows. Those are
+    found from (2r+1)x(2r+1) blocks of the board, so only what is remembered next to the window is checked.
+    """
+
+    def __init__(self, height: int = 10, width: int = 10, visionRadius: int = 2):
+        self.height = height
+        self.width = width
+        self.visionRadius = visionRadius
+        self.turn = 0
+        self.position: Optional[tuple[int, int]] = None
+        self.__cells = bytearray([UNKNOWN]) * (height * width)
+        self.walls: set[tuple[int, int]] = set()
+        # {(x,y): (value, turn last seen)}
+        self.coins: dict[tuple[int, int], tuple[int, int]] = {}
+        # {playerName: ((x,y), turn last seen)}
+        self.teammates: dict[str, tuple[tuple[int, int], int]] = {}
+        # Enemies are not named in game_state, they are remembered until a later window shows their cell without one
+        self.enemies: set[tuple[int, int]] = set()
+        # {(x // (2r+1), y // (2r+1)): remembered coins and enemies in that block}
+        self.__blocks: dict[tuple[int, int], set[tuple[int, int]]] = {}
+        # Players that updated on the current turn, see update
+        self.__updated: set[str] = set()
+
+    def update(self, gameData: dict, playerName: Optional[str] = None, turn: Optional[int] = None) -> int:
+        """
+        Folds in one game_state payload
+        :param playerName: Whose state this is, records their position with the teammates. Lets one model be
+                           shared by a whole team.
+        :param turn: Turn the state belongs to. Defaults to the current turn until a player updates a second
+                     time, or to one more than the last update without a playerName, so a model shared by a
+                     team counts rounds.
+        :return: The turn of this update
+        """
+        if turn is not None:
+            if turn != self.turn:
+                self.__updated.clear()
+            self.turn = turn
+        elif playerName is None or not self.__updated or playerName in self.__updated:
+            self.turn += 1
+            self.__updated.clear()
+        if playerName is not None:
+            self.__updated.add(playerName)
+
+        cells, width = self.__cells, self.width
+        x, y = gameData['currentPosition']
+        previousPosition, self.position = self.position, (x, y)
+        radius = self.visionRadius
+        minX, maxX = max(x - radius, 0), min(x + radius, self.height - 1)
+        minY, maxY = max(y - radius, 0), min(y + radius, width - 1)
+
+        # One translate per row marks every cell of the window as seen, without visiting them one by one
+        for cx in range(minX, maxX + 1):
+            row = slice(cx * width + minY, cx * width + maxY + 1)
+            cells[row] = cells[row].translate(SEEN)
+
+        coins = [(key, [tuple(loc) for loc in gameData[key]]) for key in COIN_KEYS]
+        enemies = [tuple(loc) for loc in gameData['enemyPositions']]
+        reported = {loc for _, locs in coins for loc in locs}
+        reported.update(enemies)
+
+        # Coins and enemies remembered inside the window that it no longer shows are gone
+        size = 2*radius + 1
+        for bx in range(minX // size, maxX // size + 1):
+            for by in range(minY // size, maxY // size + 1):
+                for loc in list(self.__blocks.get((bx, by), ())):
+                    if loc not in reported and minX <= loc[0] <= maxX and minY <= loc[1] <= maxY:
+                        self.__clear(loc)
+        # So are teammates last seen inside the window, unless it still shows them. The cells they have moved to
+        # are filled in below.
+        for loc, _ in self.teammates.values():
+            if minX <= loc[0] <= maxX and minY <= loc[1] <= maxY and cells[loc[0] * width + loc[1]] == CellKind.PLAYER:
+                cells[loc[0] * width + loc[1]] = CellKind.EMPTY
+        # Standing on a cell means any coin there was just collected
+        self.__clear((x, y))
+        if playerName is None and previousPosition is not None and previousPosition not in reported:
+            self.__clear(previousPosition)
+
+        for wx, wy in gameData['walls']:
+            cells[wx * width + wy] = CellKind.WALL
+            self.walls.add((wx, wy))
+        for key, locs in coins:
+            kind, value = COIN_KEYS[key]
+            for loc in locs:
+                cells[loc[0] * width + loc[1]] = kind
+                self.coins[loc] = (value, self.turn)
+                self.enemies.discard(loc)
+        for loc in enemies:
+            cells[loc[0] * width + loc[1]] = CellKind.PLAYER
+            self.enemies.add(loc)
+            # A player standing on a cell has collected the coin that was there
+            self.coins.pop(loc, None)
+        for loc in reported:
+            self.__blocks.setdefault(self.__block(loc), set()).add(loc)
+
+        # Every previous cell is cleared before any new one is set, a teammate may have stepped where another was
+        teammates = [(name, tuple(loc)) for name, loc in zip(gameData['teammateNames'], gameData['teammatePositions'])]
+        if playerName is not None:
+            teammates.append((playerName, (x, y)))
+        for name, _ in teammates:
+            previous = self.teammates.get(name)
+            if previous is not None and previous[0] not in self.enemies and cells[previous[0][0] * width + previous[0][1]] == CellKind.PLAYER:
+                cells[previous[0][0] * width + previous[0][1]] = CellKind.EMPTY
+        for name, loc in teammates:
+            cells[loc[0] * width + loc[1]] = CellKind.PLAYER
+            self.teammates[name] = (loc, self.turn)
+        cells[x * width + y] = CellKind.PLAYER
+        return self.turn
+
+    def __clear(self, loc: tuple[int, int]):
+        cells, index = self.__cells, loc[0] * self.width + loc[1]
+        if cells[index] != CellKind.WALL:
+            cells[index] = CellKind.EMPTY
+        self.coins.pop(loc, None)
+        self.enemies.discard(loc)
+        block = self.__blocks.get(self.__block(loc))
+        if block is not None:
+            block.discard(loc)
+
+    def __block(self, loc: tuple[int, int]) -> tuple[int, int]:
+        size = 2*self.visionRadius + 1
+        return loc[0] // size, loc[1] // size
+
+    def kindAt(self, loc: tuple[int, int]) -> int:
+        """
+        :return: CellKind code of what was last seen on loc, UNKNOWN if it was never seen
+        """
+        return self.__cells[loc[0] * self.width + loc[1]]
+
+    def known(self, loc: tuple[int, int]) -> bool:
+        return self.__cells[loc[0] * self.width + loc[1]] != UNKNOWN
+
+    def isWall(self, loc: tuple[int, int]) -> bool:
+        return self.__cells[loc[0] * self.width + loc[1]] == CellKind.WALL
+
+    def coinAt(self, loc: tuple[int, int]) -> Optional[tuple[int, int]]:
+        """
+        :return: (value, turn last seen) of the coin remembered on loc, None if there is none
+        """
+        return self.coins.get(loc)
+
+    def blocked(self) -> set[tuple[int, int]]:
+        """
+        Cells a path should avoid: known walls, enemies where they were last seen and teammates seen on the
+        current turn, see pathfinding.py. Older teammate positions are left out, they have moved on since.
+        """
+        teammates = {loc for loc, turn in self.teammates.values() if turn >= self.turn}
+        return self.walls | self.enemies | teammates
+
+    def unknownCount(self) -> int:
+        return self.__cells.count(UNKNOWN)